@@ -0,0 +1,45 @@
+from PyQt5 import QtCore
+
+
+class JobCancelled(Exception):
+    # Raised inside a job's function when the job was cancelled
+    pass
+
+
+class BackgroundJob(QtCore.QThread):
+    # Runs function(report) in its own thread. The function calls
+    # report(percent) between its steps: the value is sent to the progress
+    # signal, and JobCancelled is raised if the job was cancelled, so that
+    # the function stops at that point. The function's return value is sent
+    # to the resultReady signal, unless the job was cancelled.
+    progress = QtCore.pyqtSignal(int)
+    resultReady = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, function, parent=None):
+        super(BackgroundJob, self).__init__(parent)
+        self.function = function
+        self.cancelled = False
+
+    def Cancel(self):
+        # Asks the job to stop at its next report
+        self.cancelled = True
+
+    def IsCancelled(self):
+        return self.cancelled
+
+    def Report(self, percent):
+        if self.cancelled:
+            raise JobCancelled()
+        self.progress.emit(int(percent))
+
+    def run(self):
+        try:
+            result = self.function(self.Report)
+        except JobCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(repr(e))
+            return
+        if not self.cancelled:
+            self.resultReady.emit(result)
@@ -0,0 +1,43 @@
+import sys
+import time
+from sklearn import manifold
+import dataprovider
+import mp
+
+
+# Wall-clock time of the MDS projections on samples of case_data.txt.
+# Run from the directory of the data files, the sample sizes are optional:
+#   python benchmark.py 500 1000 2000 > bench_output.txt
+SIZES = [500, 1000, 2000]
+WEIGHTS = [1.0, 0.5, 0.0, 0.5, 0.0, 1.0]
+
+
+def Timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def Smacof(dots, init=None):
+    # sklearn's metric MDS, as used by learn.mdsClass before the classical start
+    mds = manifold.MDS(n_components=2, metric=True, dissimilarity="precomputed", n_init=4 if init is None else 1, init="random", random_state=0)
+    return mds.fit(dots, init=init).embedding_
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    data = dataprovider.DataProvider(max(sizes), WEIGHTS, keep_components=False, cache_dir=None)
+    print("%6s %-22s %10s %8s" % ("size", "projection", "seconds", "stress"))
+    for size in sizes:
+        data.SetSize(size)
+        cond = data.Calculate(condensed=True)
+        dots = data.Calculate()
+        runs = [("smacof", lambda: Smacof(dots)),
+                ("classical", lambda: mp.ClassicalMDS()(cond, random_state=0)),
+                ("classical+smacof", lambda: Smacof(dots, mp.ClassicalMDS()(cond, random_state=0))),
+                ("landmark", lambda: mp.LandmarkMDS()((data.size, data.DistanceColumns), random_state=0))]
+        for name, run in runs:
+            seconds, pos = Timed(run)
+            print("%6d %-22s %10.3f %8.4f" % (size, name, seconds, mp.normalized_stress(cond, pos, sample_size=None)))
+        sys.stdout.flush()
+    data.Close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a helper to redraw only the interactive artists of a
+figure (hovered points, brushed points, selection lines) on top of a cached
+copy of its static contents.
+"""
+
+
+class BlitManager(object):
+    """
+    Keeps a copy of the rendered figure without its animated artists and
+    redraws only these artists on top of it. The copy is taken on every full
+    draw of the canvas, so any change to the static artists must be followed
+    by a full draw (canvas.draw()), while changes to the animated artists
+    only need a call to update().
+
+    On canvases that do not support blitting, the artists are not animated
+    and every update is a full draw, which includes them.
+    """
+
+    def __init__(self, canvas, animated_artists=()):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        canvas: matplotlib.backend_bases.FigureCanvasBase
+            The canvas to draw on.
+        animated_artists: iterable of matplotlib.artist.Artist
+            The artists that are redrawn on every update. Default is empty.
+        """
+        self._canvas = canvas
+        self._background = None
+        self._artists = []
+        for art in animated_artists:
+            self.add_artist(art)
+        self._cb_draw_id = canvas.mpl_connect('draw_event', self._on_draw)
+
+    @property
+    def canvas(self):
+        """
+        Returns the canvas managed by this object.
+        """
+        return self._canvas
+
+    @property
+    def artists(self):
+        """
+        Returns the list of animated artists, in drawing order.
+        """
+        return self._artists
+
+    def add_artist(self, art):
+        """
+        Adds an artist to the animated set. The artist is excluded from full
+        draws of the canvas and drawn by update() instead, unless the canvas
+        does not support blitting.
+
+        Parameters
+        ----------
+        art: matplotlib.artist.Artist
+            The artist. It must belong to the canvas' figure.
+        """
+        if art.figure is not self.canvas.figure:
+            raise ValueError('The artist does not belong to this figure.')
+        # Full draws leave out animated artists, so without blitting they
+        # would never be drawn.
+        art.set_animated(self.canvas.supports_blit)
+        self._artists.append(art)
+
+    def remove_artist(self, art):
+        """
+        Removes an artist from the animated set. The artist is drawn by full
+        draws of the canvas again. Nothing is done if the artist is not in
+        the set.
+        """
+        if art in self._artists:
+            self._artists.remove(art)
+            art.set_animated(False)
+
+    def clear(self):
+        """
+        Removes all artists from the animated set.
+        """
+        for art in self._artists:
+            art.set_animated(False)
+        self._artists = []
+
+    def invalidate(self):
+        """
+        Discards the cached background. The next update will be a full draw.
+        """
+        self._background = None
+
+    def update(self):
+        """
+        Restores the cached background and draws the animated artists over
+        it. If there is no background yet, or if the canvas does not support
+        blitting, the whole canvas is drawn instead.
+        """
+        canvas = self.canvas
+        if not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        if self._background is None:
+            # The draw event callback caches the background and draws the
+            # animated artists.
+            canvas.draw()
+            return
+        canvas.restore_region(self._background)
+        self._draw_animated()
+        canvas.blit(canvas.figure.bbox)
+
+    def disconnect(self):
+        """
+        Detaches this object from the canvas' draw events.
+        """
+        if self._cb_draw_id is not None:
+            self.canvas.mpl_disconnect(self._cb_draw_id)
+            self._cb_draw_id = None
+
+    def _on_draw(self, event):
+        """
+        Callback of the canvas' draw events. Caches the freshly drawn static
+        contents and draws the animated artists over them.
+        """
+        if event is not None and event.canvas is not self.canvas:
+            return
+        if not self.canvas.supports_blit:
+            return
+        self._background = self.canvas.copy_from_bbox(
+            self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        fig = self.canvas.figure
+        for art in self._artists:
+            if art.figure is fig:
+                fig.draw_artist(art)
@@ -3,9 +3,171 @@
 
 '''
 This module contains the base class for our plots that support the
-brushing & linking technique.
+brushing & linking technique, and the selection model they use to store the
+highlighted data.
 '''
 
+import numpy as np
+
+
+class SelectionModel:
+    '''
+    Set of selected data indices, stored as a boolean mask. Bulk operations
+    receive any iterable or array of indices and return the indices whose
+    state changed. The mask grows as needed to hold the given indices. Every
+    change increments the version counter.
+
+    The model behaves as a read-only set of ints: it supports len(), the in
+    operator and iteration in ascending order.
+    '''
+
+    def __init__(self, size=0):
+        '''
+        SelectionModel default constructor.
+
+        Arguments
+        ---------
+        size: int
+            The initial number of data instances. Default is 0.
+        '''
+        self._mask = np.zeros(size, dtype=bool)
+        self._count = 0
+        self._version = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, data_idx):
+        try:
+            return 0 <= data_idx < self._mask.size and bool(
+                self._mask[data_idx])
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return iter(self.indices().tolist())
+
+    @property
+    def mask(self):
+        '''
+        Returns a read-only view of the boolean selection mask.
+        '''
+        view = self._mask.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def size(self):
+        '''
+        Returns the number of data instances covered by the mask.
+        '''
+        return self._mask.size
+
+    @property
+    def version(self):
+        '''
+        Returns the version counter, incremented on every change.
+        '''
+        return self._version
+
+    def indices(self):
+        '''
+        Returns the selected indices, in ascending order.
+
+        Returns
+        -------
+        out: numpy.array
+            The selected indices.
+        '''
+        return np.flatnonzero(self._mask)
+
+    def resize(self, size):
+        '''
+        Sets the number of data instances. Indices beyond the new size are
+        unselected.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices unselected by the resize.
+        '''
+        changed = np.flatnonzero(self._mask[size:])
+        mask = np.zeros(size, dtype=bool)
+        keep = min(size, self._mask.size)
+        mask[:keep] = self._mask[:keep]
+        self._mask = mask
+        return self._changed(changed + size)
+
+    def add(self, data_idx):
+        '''
+        Selects the given indices.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices that were not selected before.
+        '''
+        data_idx = self._as_indices(data_idx)
+        changed = data_idx[~self._mask[data_idx]]
+        self._mask[changed] = True
+        return self._changed(changed)
+
+    def remove(self, data_idx):
+        '''
+        Unselects the given indices.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices that were selected before.
+        '''
+        data_idx = self._as_indices(data_idx)
+        changed = data_idx[self._mask[data_idx]]
+        self._mask[changed] = False
+        return self._changed(changed)
+
+    def toggle(self, data_idx):
+        '''
+        Inverts the selection state of the given indices.
+
+        Returns
+        -------
+        out: numpy.array
+            The given indices, without repetitions.
+        '''
+        data_idx = self._as_indices(data_idx)
+        self._mask[data_idx] = ~self._mask[data_idx]
+        return self._changed(data_idx)
+
+    def clear(self):
+        '''
+        Unselects all indices.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices that were selected before.
+        '''
+        changed = self.indices()
+        self._mask[:] = False
+        return self._changed(changed)
+
+    def _as_indices(self, data_idx):
+        if isinstance(data_idx, (set, frozenset)):
+            data_idx = list(data_idx)
+        data_idx = np.unique(np.asarray(data_idx, dtype=np.intp).ravel())
+        if data_idx.size and data_idx[-1] >= self._mask.size:
+            mask = np.zeros(data_idx[-1] + 1, dtype=bool)
+            mask[:self._mask.size] = self._mask
+            self._mask = mask
+        return data_idx
+
+    def _changed(self, changed):
+        if changed.size:
+            self._count = int(np.count_nonzero(self._mask))
+            self._version += 1
+        return changed
+
 
 class BrushableCanvas:
     '''
@@ -27,11 +189,16 @@ class BrushableCanvas:
             The parent widget. Default is None. The parent widget must implement
             the 'set_brushed_data' method. This method receives this objects's
             canvas_name and a list containing the indices of all objects
-            highlighted.
+            highlighted. If the parent also implements the
+            'update_brushed_data' method, it is called instead, with this
+            object's canvas_name, the arrays of indices highlighted and
+            erased since the last notification, and the selection version.
         '''
         self._name = canvas_name
         self._parent_canvas = parent
-        self._highlighted_data = set()
+        self._highlighted_data = SelectionModel()
+        self._notified_mask = np.zeros(0, dtype=bool)
+        self._notification_pending = False
 
     def __del__(self):
         del self._highlighted_data
@@ -53,11 +220,11 @@ class BrushableCanvas:
     @property
     def highlighted_data(self):
         '''
-        Returns the set of highlighted data indices.
+        Returns the selection model of the highlighted data indices.
 
         Returns
         -------
-        out: set
+        out: SelectionModel
             The set of indices of highlighted data.
         '''
         return self._highlighted_data
@@ -77,11 +244,57 @@ class BrushableCanvas:
     def notify_parent(self):
         '''
         Notifies the parent widget of changes in the selected data. If there is
-        no parent widget, then no action is performed.
+        no parent widget, then no action is performed. The notification is
+        scheduled by schedule_notification, so that several calls in a row
+        result in a single notification.
+        '''
+        if not self.parent_canvas or self._notification_pending:
+            return
+        self._notification_pending = True
+        self.schedule_notification(self.flush_notification)
+
+    def schedule_notification(self, callback):
+        '''
+        Schedules the delivery of a pending notification. The base class
+        calls the callback right away, GUI subclasses should call it from
+        their event loop instead, so that the changes made while handling an
+        event are notified together.
+
+        Arguments
+        ---------
+        callback: callable
+            The function that sends the notification.
         '''
-        if self.parent_canvas:
-            self.parent_canvas.set_brushed_data(self.name,
-                                                list(self.highlighted_data))
+        callback()
+
+    def flush_notification(self):
+        '''
+        Sends the pending notification to the parent widget, if any.
+        '''
+        if not self._notification_pending:
+            return
+        self._notification_pending = False
+        if not self.parent_canvas:
+            return
+
+        mask = self.highlighted_data.mask
+        notified = np.zeros(mask.size, dtype=bool)
+        keep = min(mask.size, self._notified_mask.size)
+        notified[:keep] = self._notified_mask[:keep]
+        added = np.flatnonzero(mask & ~notified)
+        erased = np.flatnonzero(~mask & notified)
+        erased = np.concatenate([erased, np.flatnonzero(
+            self._notified_mask[mask.size:]) + mask.size])
+        self._notified_mask = mask.copy()
+        if not added.size and not erased.size:
+            return
+
+        if hasattr(self.parent_canvas, 'update_brushed_data'):
+            self.parent_canvas.update_brushed_data(
+                self.name, added, erased, self.highlighted_data.version)
+        else:
+            self.parent_canvas.set_brushed_data(
+                self.name, self.highlighted_data.indices().tolist())
 
     def is_data_instance_highlighted(self, data_idx):
         '''
@@ -109,21 +322,40 @@ class BrushableCanvas:
         update_chart: boolean
             Switch that indicates if the plot should be updated with the newly
             selected data instances.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices whose highlight state changed.
         '''
-        if isinstance(data_idx, int):
-            if erase:
-                self._highlighted_data.discard(data_idx)
-            else:
-                self._highlighted_data.add(data_idx)
+        if erase:
+            changed = self._highlighted_data.remove(data_idx)
         else:
-            if isinstance(data_idx, list):
-                data_idx = set(data_idx)
-            if erase:
-                self._highlighted_data = self._highlighted_data - data_idx
-            else:
-                self._highlighted_data.update(data_idx)
+            changed = self._highlighted_data.add(data_idx)
+        if update_chart:
+            self.update_chart(selection_changed=True)
+        return changed
+
+    def toggle_data(self, data_idx, update_chart=True):
+        '''
+        Inverts the highlight state of data instances.
+
+        Arguments
+        ---------
+        data_idx: int or iterable
+            Index (or indices) of the data instance(s).
+        update_chart: boolean
+            Switch that indicates if the plot should be updated.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices whose highlight state changed.
+        '''
+        changed = self._highlighted_data.toggle(data_idx)
         if update_chart:
             self.update_chart(selection_changed=True)
+        return changed
 
     def update_chart(self, **kwargs):
         '''
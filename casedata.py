@@ -1,6 +1,7 @@
 import math
 import numpy as np
 import csv
+import serialization
 
 
 class CaseDataCoeficients(object):
@@ -24,6 +25,11 @@ class CaseDataCoeficients(object):
         self.coef_jaccard = list[4]
         self.coef_editdist = list[5]
 
+    def get_coefs(self):
+        return np.array([self.coef_creditscore, self.coef_requestamount,
+                         self.coef_numberofoffers, self.coef_loangoal,
+                         self.coef_jaccard, self.coef_editdist])
+
 class CaseData(object):
     def __init__(self, casename, endsituation, requestamount, creditscore, variant,
                  numberofoffers, loangoal):
@@ -44,45 +50,122 @@ class CaseData(object):
         return np.array([p.variant, p.requestamount, p.creditscore, p.numberofoffers])
 
 
-
-def ReadData(cf):
-    casedata = []
-    index = 0
-    with open('./case_data.txt', 'r') as f:
+class CaseTable(object):
+    """
+    Columnar storage of the cases. Each attribute is kept in a contiguous
+    array indexed by the case number, and the loan goals are stored as
+    integer codes into loangoal_names.
+    """
+    COLUMNS = ('casename', 'endsituation', 'requestamount', 'creditscore',
+               'variant', 'numberofoffers', 'loangoal', 'loangoal_names')
+
+    def __init__(self, casename, endsituation, requestamount, creditscore,
+                 variant, numberofoffers, loangoal, loangoal_names):
+        self.casename = np.asarray(casename)
+        self.endsituation = np.ascontiguousarray(endsituation, dtype=np.int64)
+        self.requestamount = np.ascontiguousarray(requestamount, dtype=np.float64)
+        self.creditscore = np.ascontiguousarray(creditscore, dtype=np.float64)
+        self.variant = np.ascontiguousarray(variant, dtype=np.int64)
+        self.numberofoffers = np.ascontiguousarray(numberofoffers, dtype=np.float64)
+        self.loangoal = np.ascontiguousarray(loangoal, dtype=np.int32)
+        self.loangoal_names = np.asarray(loangoal_names)
+
+    def __len__(self):
+        return self.requestamount.shape[0]
+
+    def GetColumns(self):
+        # Column arrays by name, CaseTable(**columns) rebuilds the table.
+        return dict((name, getattr(self, name)) for name in self.COLUMNS)
+
+    def __getitem__(self, index):
+        # Slices return views of the columns, index arrays return copies.
+        return CaseTable(self.casename[index], self.endsituation[index],
+                         self.requestamount[index], self.creditscore[index],
+                         self.variant[index], self.numberofoffers[index],
+                         self.loangoal[index], self.loangoal_names)
+
+    def GetCase(self, i):
+        return CaseData(str(self.casename[i]), int(self.endsituation[i]),
+                        float(self.requestamount[i]), float(self.creditscore[i]),
+                        int(self.variant[i]), float(self.numberofoffers[i]),
+                        str(self.loangoal_names[self.loangoal[i]]))
+
+
+def BinaryPath(filename):
+    # Directory of the binary columnar copy of a case file.
+    return filename + '.cols'
+
+
+def ReadData(cf, filename='./case_data.txt', use_binary=True):
+    # The text file is parsed once, later reads memory-map its binary copy,
+    # which is rebuilt whenever the text file changes.
+    table = None
+    if use_binary:
+        columns = serialization.load_columns(BinaryPath(filename), filename)
+        if columns is not None:
+            table = CaseTable(**columns)
+    if table is None:
+        table = ParseData(filename)
+        if use_binary:
+            try:
+                serialization.save_columns(BinaryPath(filename), table.GetColumns(), filename)
+            except OSError:
+                # e.g. a read-only data directory, parsed again next time.
+                pass
+
+    UpdateMaxValues(len(table), table, cf)
+    return table
+
+
+def ParseData(filename):
+    with open(filename, 'r') as f:
         # skip header
         first_line = f.readline()
-        for line in f:
-            coefs = line.split()
-            requestamount = float(coefs[2])
-            creditscore = float(coefs[3])
-            numberofoffers = float(coefs[5])
-            cf.max_requestamount = np.fmax(cf.max_requestamount, float(requestamount))
-            cf.max_creditscore = np.fmax(cf.max_creditscore, float(creditscore))
-            cf.max_numberofoffers = np.fmax(cf.max_numberofoffers, float(numberofoffers))
-            cd = CaseData(coefs[0], int(coefs[1]), float(coefs[2]), float(coefs[3]), float(coefs[4]), float(coefs[5]), coefs[6])
-            casedata.append(cd)
-            index = index + 1
-
-    return casedata
+        rows = [line.split() for line in f if line.strip()]
+
+    columns = list(zip(*rows))
+    loangoal_names, loangoal = np.unique(np.array(columns[6]), return_inverse=True)
+    table = CaseTable(np.array(columns[0]),
+                      np.array(columns[1], dtype=np.float64).astype(np.int64),
+                      np.array(columns[2], dtype=np.float64),
+                      np.array(columns[3], dtype=np.float64),
+                      np.array(columns[4], dtype=np.float64).astype(np.int64),
+                      np.array(columns[5], dtype=np.float64),
+                      loangoal, loangoal_names)
+    return table
+
+def RecodeLoanGoals(cases, loangoal_names):
+    # Same cases with their loan goal codes into loangoal_names, so that they
+    # can be compared with a table using those names (see
+    # CompositeDistanceBlock). Goals missing from loangoal_names get new codes,
+    # appended to the returned table's names.
+    names = list(loangoal_names)
+    index = dict((name, code) for code, name in enumerate(names))
+    codes = np.empty(len(cases.loangoal_names), dtype=np.int32)
+    for old, name in enumerate(cases.loangoal_names):
+        if name not in index:
+            index[name] = len(names)
+            names.append(name)
+        codes[old] = index[name]
+    return CaseTable(cases.casename, cases.endsituation, cases.requestamount,
+                     cases.creditscore, cases.variant, cases.numberofoffers,
+                     codes[cases.loangoal], np.array(names))
 
 def SaveData(filename,cases,caseIndexes):
     f = open(filename +'.csv', 'w')
     line = 'CaseName,EndPointSituation,RequestAmount,CreditScore,Variant,NumberOfOffers,LoanGoal\n'
     f.write(line)
     for i in caseIndexes:
-        line = cases[i].casename + "," + str(cases[i].endsituation) + "," + str(cases[i].requestamount) + "," + str(cases[i].creditscore) + "," + str(cases[i].variant) + "," + str(cases[i].numberofoffers) + "," + str(cases[i].loangoal) + '\n'
+        line = str(cases.casename[i]) + "," + str(cases.endsituation[i]) + "," + str(cases.requestamount[i]) + "," + str(cases.creditscore[i]) + "," + str(cases.variant[i]) + "," + str(cases.numberofoffers[i]) + "," + str(cases.loangoal_names[cases.loangoal[i]]) + '\n'
         f.write(line)
     f.close()
 
 
 def UpdateMaxValues(number_of_cases, case_datas, cf):
-    cf.max_numberofoffers = -1.0
-    cf.max_creditscore = -1.0
-    cf.max_requestamount = -1.0
-    for i in range(0, number_of_cases):
-        cf.max_requestamount = np.fmax(cf.max_requestamount, case_datas[i].requestamount)
-        cf.max_creditscore = np.fmax(cf.max_creditscore, case_datas[i].creditscore)
-        cf.max_numberofoffers = np.fmax(cf.max_numberofoffers, case_datas[i].numberofoffers)
+    # fmax ignores NaNs, starting from -1 as the coefficients do.
+    cf.max_numberofoffers = np.fmax.reduce(case_datas.numberofoffers[:number_of_cases], initial=-1.0)
+    cf.max_creditscore = np.fmax.reduce(case_datas.creditscore[:number_of_cases], initial=-1.0)
+    cf.max_requestamount = np.fmax.reduce(case_datas.requestamount[:number_of_cases], initial=-1.0)
 
 
 
@@ -94,3 +177,50 @@ def CompositeDistance(a, b, cf, jaccard, editdist):
                   math.exp(-cf.coef_numberofoffers * abs(a.numberofoffers - b.numberofoffers) / cf.max_numberofoffers) *
                   math.exp(-cf.coef_loangoal * (a.loangoal != b.loangoal)) *
                   math.exp(-cf.coef_jaccard * jaccard) * math.exp(-cf.coef_editdist * editdist))
+
+
+def CompositeDistanceBlock(a, b, cf, jaccard, editdist):
+    """
+    Vectorized CompositeDistance between every case of the table a (rows)
+    and every case of the table b (columns). jaccard and editdist are the
+    variant indexed matrices, both tables must share the loan goal codes.
+    Returns a len(a) x len(b) matrix.
+    """
+    vara = a.variant[:, np.newaxis] - 1
+    varb = b.variant[np.newaxis, :] - 1
+    expo = cf.coef_creditscore * np.abs(a.creditscore[:, np.newaxis] - b.creditscore) / cf.max_creditscore
+    expo += cf.coef_requestamount * np.abs(a.requestamount[:, np.newaxis] - b.requestamount) / cf.max_requestamount
+    expo += cf.coef_numberofoffers * np.abs(a.numberofoffers[:, np.newaxis] - b.numberofoffers) / cf.max_numberofoffers
+    expo += cf.coef_loangoal * (a.loangoal[:, np.newaxis] != b.loangoal)
+    expo += cf.coef_jaccard * jaccard[vara, varb]
+    expo += cf.coef_editdist * editdist[vara, varb]
+    # exp(-x) * exp(-y) == exp(-(x + y)), a single exp per pair.
+    return 1.0 - np.exp(-expo)
+
+
+def CompositeComponentsBlock(a, b, cf, jaccard, editdist):
+    """
+    Unweighted terms of CompositeDistanceBlock, in the order of
+    CaseDataCoeficients.get_coefs. None of them depend on the weights, so
+    they can be computed once and recombined with CombineComponents.
+    Returns a 6 x len(a) x len(b) array.
+    """
+    vara = a.variant[:, np.newaxis] - 1
+    varb = b.variant[np.newaxis, :] - 1
+    comps = np.empty((6, len(a), len(b)))
+    comps[0] = np.abs(a.creditscore[:, np.newaxis] - b.creditscore) / cf.max_creditscore
+    comps[1] = np.abs(a.requestamount[:, np.newaxis] - b.requestamount) / cf.max_requestamount
+    comps[2] = np.abs(a.numberofoffers[:, np.newaxis] - b.numberofoffers) / cf.max_numberofoffers
+    comps[3] = a.loangoal[:, np.newaxis] != b.loangoal
+    comps[4] = jaccard[vara, varb]
+    comps[5] = editdist[vara, varb]
+    return comps
+
+
+def CombineComponents(comps, cf):
+    """
+    Weighted sum of the components given by CompositeComponentsBlock,
+    returning the composite distance for the current coefficients.
+    """
+    coefs = cf.get_coefs().astype(comps.dtype)
+    return 1.0 - np.exp(-np.tensordot(coefs, comps, axes=1))
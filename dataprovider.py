@@ -1,42 +1,420 @@
 import casedata
+import serialization
+import os
 import numpy as np
 import pandas as pd
-from multiprocessing import Pool
+from multiprocessing import Pool, shared_memory
+from scipy import sparse
+from scipy.spatial.distance import squareform
+
+# Number of matrix entries computed by each task of the pool.
+BLOCK_ELEMENTS = 2 ** 22
+
+CASE_FILE = './case_data.txt'
+EDITDIST_FILE = 'editDist.csv'
+JACCARD_FILE = 'all_SimilarityMatrix.csv'
+
+# Distance matrices computed before are loaded from here, None disables it.
+CACHE_DIR = './distance_cache'
+CACHE_MAX_BYTES = 8 * 1024 ** 3
+
+# Largest size of the kept distance components, six condensed matrices.
+# Above it only the distances are kept, as with keep_components=False.
+COMPONENTS_MAX_BYTES = 1024 ** 3
+
+
+def CondensedStart(i, n):
+    # Position of the pair (i, i + 1) in the condensed vector of n cases,
+    # which holds the upper triangle row by row as scipy's squareform.
+    return i * n - i * (i + 1) // 2
+
+
+def CondensedSubset(cond, n, m):
+    # Condensed entries of the first m of n cases, taken along the last
+    # axis of cond. Each of their rows is the start of the row for n cases.
+    if m == n:
+        return cond
+    parts = [cond[..., CondensedStart(i, n):CondensedStart(i, n) + m - i - 1] for i in range(m - 1)]
+    return np.concatenate(parts, axis=-1) if parts else cond[..., :0].copy()
+
+
+def CondensedBlock(cases, start, stop, cf, jaccard, editdist, dtype):
+    # Pairs (i, j > i) for the rows [start, stop) of cases, each pair
+    # computed once. Row-major order of the block's upper triangle is the
+    # order of the condensed vector, so this is its slice for those rows.
+    cases = cases[start:]
+    block = casedata.CompositeDistanceBlock(cases[:stop - start], cases, cf, jaccard, editdist)
+    return block[np.triu(np.ones(block.shape, dtype=bool), 1)].astype(dtype)
+
+
+def ComponentsBlock(cases, start, stop, cf, jaccard, editdist, dtype):
+    # Same as CondensedBlock, for the unweighted components.
+    cases = cases[start:]
+    comps = casedata.CompositeComponentsBlock(cases[:stop - start], cases, cf, jaccard, editdist)
+    return comps[:, np.triu(np.ones(comps.shape[1:], dtype=bool), 1)].astype(dtype)
+
+
+def KNNBlock(cases, start, stop, k, cf, jaccard, editdist, dtype):
+    # The k nearest neighbours of the rows [start, stop), sorted by
+    # distance, as (indices, distances) arrays of shape (rows, k).
+    block = casedata.CompositeDistanceBlock(cases[start:stop], cases, cf, jaccard, editdist)
+    rows = np.arange(stop - start)
+    block[rows, rows + start] = np.inf
+    nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+    dists = block[rows[:, np.newaxis], nearest]
+    order = np.argsort(dists, axis=1)
+    return (np.take_along_axis(nearest, order, axis=1),
+            np.take_along_axis(dists, order, axis=1).astype(dtype))
+
+
+#-----------------------------------------------
+# Shared memory used by the pool workers
+#-----------------------------------------------
+def ShareArray(arr):
+    # Copies arr into a new shared memory block. Returns the block, which
+    # must be given to ReleaseShared when no longer needed, and the
+    # descriptor the workers use to attach to it.
+    arr = np.asarray(arr)
+    shm, desc = EmptySharedArray(arr.shape, arr.dtype)
+    SharedView(shm, desc)[...] = arr
+    return shm, desc
+
+
+def EmptySharedArray(shape, dtype):
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    return shm, (shm.name, tuple(shape), dtype.str)
+
+
+def SharedView(shm, desc):
+    return np.ndarray(desc[1], desc[2], buffer=shm.buf)
+
+
+def ReleaseShared(shm):
+    shm.close()
+    shm.unlink()
+
+
+# Per process state of the pool workers.
+_worker_data = {}
+
+def _InitWorker(columns, jaccard, editdist):
+    # Runs once in every pool process. The case columns and the variant
+    # matrices are attached, not copied.
+    blocks = []
+    def attach(desc):
+        blocks.append(shared_memory.SharedMemory(name=desc[0]))
+        return SharedView(blocks[-1], desc)
+    _worker_data['cases'] = casedata.CaseTable(**dict((name, attach(desc)) for name, desc in columns.items()))
+    _worker_data['jaccard'] = attach(jaccard)
+    _worker_data['editdist'] = attach(editdist)
+    _worker_data['blocks'] = blocks
+
+
+def _WorkerTask(kind, start, stop, size, cf, out, *args):
+    # Computes the rows [start, stop) of the first size cases and writes
+    # them into the shared output buffers described by out.
+    cases = _worker_data['cases'][:size]
+    jaccard = _worker_data['jaccard']
+    editdist = _worker_data['editdist']
+    blocks = [shared_memory.SharedMemory(name=desc[0]) for desc in out]
+    bufs = [SharedView(shm, desc) for shm, desc in zip(blocks, out)]
+    if kind == 'condensed':
+        bufs[0][CondensedStart(start, size):CondensedStart(stop, size)] = CondensedBlock(cases, start, stop, cf, jaccard, editdist, bufs[0].dtype)
+    elif kind == 'components':
+        bufs[0][:, CondensedStart(start, size):CondensedStart(stop, size)] = ComponentsBlock(cases, start, stop, cf, jaccard, editdist, bufs[0].dtype)
+    elif kind == 'knn':
+        bufs[0][start:stop], bufs[1][start:stop] = KNNBlock(cases, start, stop, args[0], cf, jaccard, editdist, bufs[1].dtype)
+    elif kind == 'grow':
+        # Rows of a matrix for fewer cases, given by args, that grew to size
+        # cases: the old pairs are copied, only the new columns computed.
+        old_desc, old_size = args
+        old_shm = shared_memory.SharedMemory(name=old_desc[0])
+        old = SharedView(old_shm, old_desc)
+        for i in range(start, stop):
+            new_i = CondensedStart(i, size)
+            bufs[0][..., new_i:new_i + old_size - i - 1] = old[..., CondensedStart(i, old_size):CondensedStart(i + 1, old_size)]
+        del old
+        old_shm.close()
+        if bufs[0].ndim == 2:
+            block = casedata.CompositeComponentsBlock(cases[start:stop], cases[old_size:], cf, jaccard, editdist)
+        else:
+            block = casedata.CompositeDistanceBlock(cases[start:stop], cases[old_size:], cf, jaccard, editdist)
+        rows = np.arange(start, stop)
+        dest = (CondensedStart(rows, size) + old_size - rows - 1)[:, np.newaxis] + np.arange(size - old_size)
+        bufs[0][..., dest] = block
+    # The views must go before the blocks are closed.
+    del bufs
+    for shm in blocks:
+        shm.close()
+
+
+def _WorkerTaskArgs(args):
+    # Entry point for Pool.imap, which passes each task as a single tuple.
+    return _WorkerTask(*args)
+
 
 class DataProvider(object):
-    def __init__(self,size,list_weigth):
+    def __init__(self,size,list_weigth,keep_components=True,cache_dir=CACHE_DIR,cache_max_bytes=CACHE_MAX_BYTES,dtype=np.float64,processes=None):
+        # Shared memory blocks and worker pool, created on the first pool
+        # computation and kept until Close, so later computations reuse them.
+        self.shared = None
+        self.shared_desc = None
+        self.kept_shm = None
+        self.pool = None
+        self.processes = processes or os.cpu_count() or 1
+
         self.size = size
+        # Storage type of the components and of the condensed distances.
+        self.dtype = np.dtype(dtype)
+        # When set, the weight independent terms of the distance are kept
+        # so that a weight change does not recompute every pair. Otherwise
+        # the last distances are kept, while the weights do not change.
+        # Either is kept for the largest size computed, so that a smaller
+        # size is a slice of it and a larger one only adds the new pairs.
+        # The components are dropped for sizes where they would take more
+        # than COMPONENTS_MAX_BYTES.
+        self.keep_components = keep_components
+        self.kept = None
+        self.kept_size = 0
+        self.kept_weights = None
         self.caseDataCoefs = casedata.CaseDataCoeficients()
         self.caseDataCoefs.set_coefs(list_weigth)
-        self.casedata_v = np.array(casedata.ReadData(self.caseDataCoefs))
-        self.editDist = np.array(pd.read_csv('editDist.csv', sep=';',header=None))
-        self.jaccard = np.array(pd.read_csv('all_SimilarityMatrix.csv', sep=';', header=None))
-        self.list_end_info = np.zeros(self.size)
-        for i in range(self.size):
-            self.list_end_info[i] = self.casedata_v[i].endsituation
+        self.casedata_v = casedata.ReadData(self.caseDataCoefs, CASE_FILE)
+        self.editDist = np.ascontiguousarray(pd.read_csv(EDITDIST_FILE, sep=';',header=None), dtype=np.float64)
+        self.jaccard = np.ascontiguousarray(pd.read_csv(JACCARD_FILE, sep=';', header=None), dtype=np.float64)
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = serialization.DistanceCache(cache_dir, cache_max_bytes)
+        self.list_end_info = self.casedata_v.endsituation[:self.size].astype(np.float64)
+
+    def __del__(self):
+        self.Close()
+
+    def Close(self):
+        # Stops the worker pool and releases the shared memory. The provider
+        # can still be used afterwards, both are created again when needed.
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.ReleaseKept()
+        if self.shared is not None:
+            for shm in self.shared:
+                ReleaseShared(shm)
+            self.shared = None
+            self.shared_desc = None
 
     def GetEndSituation(self):
         return self.list_end_info
 
+    def SetWeights(self, list_weigth):
+        self.caseDataCoefs.set_coefs(list_weigth)
+
+    def SetSize(self, size):
+        # Changes the number of cases used, the loaded data, the pool and
+        # the kept matrix are reused.
+        self.size = size
+        self.list_end_info = self.casedata_v.endsituation[:self.size].astype(np.float64)
+
     def DataProviderMDS(self,initial):
-         m = np.zeros(shape=(self.size))
-         for j in range(0,self.size):
-             vari = int(self.casedata_v[initial].variant) - 1
-             varj = int(self.casedata_v[j].variant) - 1
-             edition = float(self.editDist[vari,varj])
-             jac = float(self.jaccard[vari,varj])
-             m[j] = casedata.CompositeDistance(self.casedata_v[initial], self.casedata_v[j],self.caseDataCoefs, jac, edition)
-         return m
-    
-
-    def Calculate(self):
+        return self.DataProviderBlock(initial, initial + 1)[0]
+
+    def DataProviderBlock(self, start, stop):
+        # Rows [start, stop) of the dissimilarity matrix, in one kernel call.
+        cases = self.casedata_v[:self.size]
+        return casedata.CompositeDistanceBlock(cases[start:stop], cases, self.caseDataCoefs, self.jaccard, self.editDist)
+
+    def DistanceColumns(self, idx):
+        # Dissimilarities between every case and the cases idx, a size x
+        # len(idx) matrix: the columns idx of the dissimilarity matrix.
+        # Computed by row blocks, so only O(size * len(idx)) memory is used.
+        cases = self.casedata_v[:self.size]
+        cols = cases[np.asarray(idx, dtype=np.intp)]
+        out = np.empty((self.size, len(cols)), dtype=self.dtype)
+        step = max(1, BLOCK_ELEMENTS // max(1, len(cols)))
+        for start in range(0, self.size, step):
+            stop = min(start + step, self.size)
+            out[start:stop] = casedata.CompositeDistanceBlock(cases[start:stop], cols, self.caseDataCoefs, self.jaccard, self.editDist)
+        return out
+
+    def DistancesFrom(self, cases, idx=None):
+        # Dissimilarities between new cases, a CaseTable read with
+        # casedata.ParseData, and the cases idx (default, the first size
+        # cases): a len(cases) x len(idx) matrix. The new cases are measured
+        # with the normalization of the loaded ones, see
+        # mp.BaseProjection.transform to place them in a projection.
+        cases = casedata.RecodeLoanGoals(cases, self.casedata_v.loangoal_names)
+        cols = self.casedata_v[:self.size] if idx is None else self.casedata_v[np.asarray(idx, dtype=np.intp)]
+        out = np.empty((len(cases), len(cols)), dtype=self.dtype)
+        step = max(1, BLOCK_ELEMENTS // max(1, len(cols)))
+        for start in range(0, len(cases), step):
+            stop = min(start + step, len(cases))
+            out[start:stop] = casedata.CompositeDistanceBlock(cases[start:stop], cols, self.caseDataCoefs, self.jaccard, self.editDist)
+        return out
+
+    def PublishShared(self):
+        # The case columns and the variant matrices are copied once into
+        # shared memory, the workers attach to them when they start.
+        if self.shared is not None:
+            return
+        self.shared = []
+        columns = {}
+        for name, arr in self.casedata_v.GetColumns().items():
+            shm, columns[name] = ShareArray(arr)
+            self.shared.append(shm)
+        shm_jaccard, jaccard = ShareArray(self.jaccard)
+        shm_editdist, editdist = ShareArray(self.editDist)
+        self.shared.extend([shm_jaccard, shm_editdist])
+        self.shared_desc = (columns, jaccard, editdist)
+
+    def GetPool(self):
+        # The pool forks its processes, so it should be created while no
+        # other thread runs: forked children of a threaded process can
+        # deadlock on locks held by the other threads.
+        if self.pool is None:
+            self.PublishShared()
+            self.pool = Pool(processes=self.processes, initializer=_InitWorker, initargs=self.shared_desc)
+        return self.pool
+
+    def BlockTasks(self, kind, out, entries_per_row, first, last, *args):
+        # Splits the rows [first, last) in contiguous ranges, each task
+        # writes its range straight into the shared output buffers of out.
+        # Bounded block size, while still giving every process some work.
+        step = max(1, min(BLOCK_ELEMENTS // max(1, entries_per_row), -(-(last - first) // self.processes)))
+        return [(kind, start, min(start + step, last), self.size, self.caseDataCoefs, out) + args
+                for start in range(first, last, step)]
+
+    def RunBlocks(self, kind, out, entries_per_row, *args, progress=None):
+        self.RunTasks(self.BlockTasks(kind, out, entries_per_row, 0, self.size, *args), progress)
+
+    def RunTasks(self, tasks, progress=None):
+        # Runs the tasks in the pool. If given, progress(done, total) is
+        # called as the tasks finish. When it raises, to cancel the
+        # computation, the pool is stopped so the remaining tasks do not
+        # keep the processes busy, and the exception is passed on.
+        pool = self.GetPool()
+        if progress is None:
+            pool.starmap(_WorkerTask, tasks)
+            return
+        try:
+            for done, _ in enumerate(pool.imap_unordered(_WorkerTaskArgs, tasks), 1):
+                progress(done, len(tasks))
+        except BaseException:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            raise
+
+    def ReleaseKept(self):
+        self.kept = None
+        self.kept_size = 0
+        if self.kept_shm is not None:
+            ReleaseShared(self.kept_shm)
+            self.kept_shm = None
+
+    def UpdateKept(self, progress=None):
+        # Returns the kept matrix for the current size: the condensed
+        # components, a 6 x size * (size - 1) / 2 array, or the condensed
+        # distances. It lives in the shared memory the workers wrote it to.
+        # progress is passed to RunTasks.
+        if self.keep_components and 6 * CondensedStart(self.size, self.size) * self.dtype.itemsize > COMPONENTS_MAX_BYTES:
+            print("keeping the distances of %d cases instead of their components" % self.size)
+            self.keep_components = False
+        weights = None
+        if not self.keep_components:
+            weights = self.caseDataCoefs.get_coefs().tolist()
+            if weights != self.kept_weights:
+                self.ReleaseKept()
+        if self.kept_size < self.size:
+            kind = 'components' if self.keep_components else 'condensed'
+            shape = (CondensedStart(self.size, self.size),)
+            if self.keep_components:
+                shape = (6,) + shape
+            shm, desc = EmptySharedArray(shape, self.dtype)
+            entries_per_row = 6 * self.size if self.keep_components else self.size
+            if self.kept is None:
+                tasks = self.BlockTasks(kind, (desc,), entries_per_row, 0, self.size)
+            else:
+                # Old rows get their new columns, the new rows are computed
+                # as usual.
+                old_desc = (self.kept_shm.name, self.kept.shape, self.kept.dtype.str)
+                tasks = (self.BlockTasks('grow', (desc,), entries_per_row, 0, self.kept_size, old_desc, self.kept_size) +
+                         self.BlockTasks(kind, (desc,), entries_per_row, self.kept_size, self.size))
+            try:
+                self.RunTasks(tasks, progress)
+            except BaseException:
+                ReleaseShared(shm)
+                raise
+            self.ReleaseKept()
+            self.kept_shm = shm
+            self.kept = SharedView(shm, desc)
+            self.kept_size = self.size
+            self.kept_weights = weights
+        return CondensedSubset(self.kept, self.kept_size, self.size)
+
+    def CacheKey(self, **kwargs):
+        return self.cache.make_key(cases=serialization.file_digest(CASE_FILE),
+                                   editdist=serialization.file_digest(EDITDIST_FILE),
+                                   jaccard=serialization.file_digest(JACCARD_FILE),
+                                   size=self.size,
+                                   weights=self.caseDataCoefs.get_coefs().tolist(),
+                                   **kwargs)
+
+    def Calculate(self, condensed=False, progress=None):
+        # Returns the dissimilarity matrix, or its condensed upper triangle
+        # (see scipy.spatial.distance.squareform) when condensed is set.
+        # progress is passed to RunTasks, it is not called if nothing needs
+        # to be computed.
         print("calculando")
-        pool = Pool(processes=8)
-        list_start_vals = range(0, self.size)
-        array_2D = np.array(pool.map(self.DataProviderMDS, list_start_vals))
-        pool.close() # ATTENTION HERE
+        cond = None
+        if self.cache is not None:
+            key = self.CacheKey(kind='condensed', dtype=self.dtype.name)
+            cond = self.cache.load(key)
+
+        if cond is None:
+            kept = self.UpdateKept(progress)
+            if self.keep_components:
+                cond = casedata.CombineComponents(kept, self.caseDataCoefs)
+            else:
+                # Never hand out views of the shared memory.
+                cond = np.array(kept)
+            if self.cache is not None:
+                self.cache.store(key, cond)
+
+        if condensed:
+            return cond
+        array_2D = squareform(cond, checks=False)
         print(array_2D)
         return array_2D
 
+    def CalculateKNN(self, k=92, progress=None):
+        # Sparse size x size graph holding the composite distance from each
+        # case to its k nearest neighbours. Built by row blocks, the dense
+        # matrix is never held in memory. The default k is enough for
+        # sklearn's t-SNE with its default perplexity of 30.
+        print("calculando vizinhos")
+        k = min(k, self.size - 1)
+        if k < 1:
+            # An empty graph would only fail later, inside the projection.
+            raise ValueError('The kNN graph needs k >= 1 and at least 2 cases, got k=%d for %d cases.' % (k, self.size))
+        shm_idx, idx = EmptySharedArray((self.size, k), np.intp)
+        shm_dists, dists = EmptySharedArray((self.size, k), self.dtype)
+        try:
+            self.RunBlocks('knn', (idx, dists), self.size, k, progress=progress)
+        except BaseException:
+            ReleaseShared(shm_idx)
+            ReleaseShared(shm_dists)
+            raise
+        indices = SharedView(shm_idx, idx).ravel()
+        data = SharedView(shm_dists, dists).ravel()
+        indptr = np.arange(0, self.size * k + 1, k)
+        # Built from its arrays, so zero distances stay as explicit entries.
+        graph = sparse.csr_matrix((data, indices, indptr), shape=(self.size, self.size), copy=True)
+        del indices, data
+        ReleaseShared(shm_idx)
+        ReleaseShared(shm_dists)
+        return graph
+
     def SaveExportedData(self,filename,indexes):
-        casedata.SaveData(filename,self.casedata_v,indexes)
\ No newline at end of file
+        casedata.SaveData(filename,self.casedata_v,indexes)
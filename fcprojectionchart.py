@@ -9,9 +9,14 @@ import matplotlib.patches as mpatches
 from PyQt5 import QtCore
 from PyQt5.QtWidgets import QSizePolicy
 
+from blitmanager import BlitManager
+from brushableplot import SelectionModel
+from levelofdetail import LOD_THRESHOLD, DensityLOD
+from spatialindex import GridIndex, ScreenSpaceIndex
+
 class ProjectionChart(FigureCanvas):
     """Ultimately, this is a QWidget (as well as a FigureCanvasAgg, etc.)."""
-    def __init__ (self, parent=None, width=5, height=4, dpi=100):
+    def __init__ (self, parent=None, width=5, height=4, dpi=100, lodThreshold=LOD_THRESHOLD):
         fig = Figure(figsize=(width, height), dpi=dpi)
         self.axes = fig.add_subplot(111)
         # We want the axes cleared every time plot() is called
@@ -29,10 +34,21 @@ class ProjectionChart(FigureCanvas):
         self.setFocusPolicy(QtCore.Qt.ClickFocus)
         
         self.pos = None
+        self.index = ScreenSpaceIndex(self.axes)
+        # Only the points inside the view are drawn, found by the grid.
+        self.viewIndex = GridIndex()
+        self.panStart = None
+        # Brushed points are drawn by an animated collection, blitted over
+        # the rest of the chart while the mouse is dragged.
+        self.blitManager = BlitManager(self)
+        self.brushed = None
+        # Above lodThreshold visible points, the points are drawn as a
+        # density image per end situation.
+        self.lod = DensityLOD(self.axes, lodThreshold)
         
         #self.save = data.SaveExportedData
         self.clicked = False
-        self.selected = []
+        self.selection = SelectionModel()
         
         ### Set Callbacks
         self.mpl_connect('button_press_event',self.buttonPressEvent)
@@ -42,8 +58,8 @@ class ProjectionChart(FigureCanvas):
         self.mpl_connect('key_release_event', self.keyReleaseEvent)
         self.mpl_connect('motion_notify_event', self.motionNotifyEvent)
         self.mpl_connect('pick_event', self.pickEvent)
+        self.mpl_connect('scroll_event', self.scrollEvent)
         # resize_event
-        # scroll_event
         # figure_enter_event
         # figure_leave_event
         # axes_enter_event
@@ -53,18 +69,22 @@ class ProjectionChart(FigureCanvas):
     def buttonPressEvent (self,event):
         #print("buttonPressEvent", event.button)
         if event.button == 3:
-            for i in self.selected:
-                self.coll._facecolors[i, :] = self.colors[int(self.endsit[i])]
-            self.selected = []
             self.clicked = False
-            self.draw()
+            if self.selection.clear().size:
+                self.updateBrushedPoints()
+                self.blitManager.update()
         if event.button == 1:
             self.clicked = True
+        # Middle button drag pans the view
+        if event.button == 2 and event.inaxes is self.axes:
+            self.panStart = (event.x, event.y, self.axes.get_xlim(), self.axes.get_ylim())
 
     def buttonReleaseEvent (self, event):
         #print("buttonRelease")
         if event.button == 1:
             self.clicked = False
+        if event.button == 2:
+            self.panStart = None
             
     def keyPressEvent (self, event):
         #print("keyPressEvent")
@@ -81,19 +101,49 @@ class ProjectionChart(FigureCanvas):
     def motionNotifyEvent (self, event):
         #print("motion", event.xdata, event.ydata, self.clicked)
         
-        if self.clicked == True:
+        if self.panStart is not None:
+            x, y, (xmin, xmax), (ymin, ymax) = self.panStart
+            dx = (event.x - x) * (xmax - xmin) / self.axes.bbox.width
+            dy = (event.y - y) * (ymax - ymin) / self.axes.bbox.height
+            self.axes.set_xlim(xmin - dx, xmax - dx)
+            self.axes.set_ylim(ymin - dy, ymax - dy)
+            self.viewChanged()
+        elif self.clicked == True:
             d = self.calcClosestDatapoint(event)
-            self.selected.extend(d)
-            self.selected = list(set(self.selected))
-            for i in range(self.selected.__len__()):
-                self.coll._facecolors[self.selected[i], :] = (1, 0.54, 0, 1)
-            self.draw()
+            # Only redrawn if new points were brushed
+            if self.selection.add(d).size:
+                self.updateBrushedPoints()
+                self.blitManager.update()
 
     def pickEvent (self, event):
         #print("pickEvent")
-        self.coll._facecolors[event.ind, :] = (1, 0.54, 0, 1)
-        self.draw()
+        if self.selection.add(event.ind).size:
+            self.updateBrushedPoints()
+            self.blitManager.update()
         self.clicked = True
+
+    def scrollEvent (self, event):
+        # Zooms in (scroll up) or out (scroll down) around the mouse cursor
+        if self.pos is None or event.xdata is None or event.ydata is None:
+            return
+        scale = 1.2 ** -event.step
+        xmin, xmax = self.axes.get_xlim()
+        ymin, ymax = self.axes.get_ylim()
+        self.axes.set_xlim(event.xdata - (event.xdata - xmin) * scale, event.xdata + (xmax - event.xdata) * scale)
+        self.axes.set_ylim(event.ydata - (event.ydata - ymin) * scale, event.ydata + (ymax - event.ydata) * scale)
+        self.viewChanged()
+
+    def resetView (self):
+        # Fits the view to all the points again
+        if self.pos is None:
+            return
+        self.axes.dataLim.update_from_data_xy(self.pos[:, 0:2], ignore=True)
+        self.axes.autoscale()
+        self.viewChanged()
+
+    def viewChanged (self):
+        self.updateLevelOfDetail()
+        self.draw()
             
     def distance (self, point, event):
         assert point.shape == (2,), "distance: point.shape is wrong: %s, must be (3,)" % point.shape
@@ -109,26 +159,59 @@ class ProjectionChart(FigureCanvas):
         Returns:
             smallestIndex (int) - the index (into the array of points X) of the element closest to the mouse position
         """
-        distances = np.array([self.distance(self.pos[i, 0:2], event) for i in range(self.pos.shape[0])])
-        brushlist = np.where(np.logical_and(distances >= 0, distances <= 10))
-        return brushlist[0]
+        return self.index.query_radius(event.x, event.y, 10)
+
+    def pickPoints (self, artist, event):
+        # Picker of the points, 5 points around the cursor, found by the index.
+        ind = self.index.query_radius(event.x, event.y, 5 * self.figure.dpi / 72)
+        return len(ind) > 0, dict(ind=ind)
+
+    def updateBrushedPoints (self):
+        # Moves the brushed points collection to the selected points.
+        if self.brushed is not None:
+            self.brushed.set_offsets(self.pos[self.selection.indices(), 0:2])
+
+    def visiblePoints (self):
+        # Indices of the points inside the view, enlarged by 5 pixels so the
+        # markers on the borders are kept
+        xmin, xmax = sorted(self.axes.get_xlim())
+        ymin, ymax = sorted(self.axes.get_ylim())
+        xpad = 5 * (xmax - xmin) / max(self.axes.bbox.width, 1)
+        ypad = 5 * (ymax - ymin) / max(self.axes.bbox.height, 1)
+        return self.viewIndex.query_box(xmin - xpad, xmax + xpad, ymin - ypad, ymax + ypad)
+
+    def updateLevelOfDetail (self):
+        # Shows either the visible points or their density image, for the
+        # current view. The brushed points are always drawn as points.
+        visible = self.visiblePoints()
+        dense = self.lod.update(visible)
+        self.coll.set_visible(not dense)
+        if not dense:
+            self.coll.set_offsets(self.pos[visible, 0:2])
+            self.coll.set_array(np.asarray(self.endsit)[visible])
 
     def getSelectedDataPointsIndexes (self):
-        assert(self.selected is not None)
-        return self.selected
+        assert(self.selection is not None)
+        return self.selection.indices().tolist()
         
     def updateDataPoints (self, pos, endsit):
         self.pos = pos
         self.endsit = endsit
+        self.index.set_data(self.pos)
+        self.viewIndex.set_data(self.pos)
         
         # Remove selection
-        for i in self.selected:
-            self.coll._facecolors[i, :] = self.colors[int(self.endsit[i])]
-        self.selected = []
+        self.selection = SelectionModel(0 if self.pos is None else len(self.pos))
+        self.blitManager.clear()
+        self.brushed = None
                 
         if self.pos is not None:
             self.axes.clear()
-            self.coll = self.axes.scatter(self.pos[:, 0], self.pos[:, 1], c=self.endsit, cmap='brg', picker=5, alpha=0.7, edgecolors='none')
+            self.coll = self.axes.scatter(self.pos[:, 0], self.pos[:, 1], c=self.endsit, cmap='brg', picker=self.pickPoints, alpha=0.7, edgecolors='none')
+            self.brushed = self.axes.scatter(np.empty(0), np.empty(0), color=(1, 0.54, 0, 1), edgecolors='none')
+            self.blitManager.add_artist(self.brushed)
+            self.lod.set_data(self.pos, np.asarray(self.endsit).astype(int), self.colors)
+            self.updateLevelOfDetail()
             
             green_patch = mpatches.Patch(color='blue', label='Aproved')
             red_patch = mpatches.Patch(color='red', label='Denied')
@@ -8,32 +8,54 @@ import copy
 from scipy.spatial import ConvexHull
 import numpy as np
 from matplotlib.path import Path
-from scipy.spatial.distance import squareform
 import sys
+import mp
+from blitmanager import BlitManager
+from spatialindex import ScreenSpaceIndex
 
 
 class mdsClass(object):
     def __init__(self):
         self.pos = []
+        self.diss = None
 
-    def mdsGen(self, data):
+    def mdsGen(self, data, init=None):
+        # init: previous positions of the first cases, the new ones start
+        # next to their nearest case (see mp.warm_start_init)
         print("initializing MDS")
-        mds = manifold.MDS(n_components=2, metric=True, dissimilarity="precomputed")
-        self.pos = mds.fit(data).embedding_
+        # Kept as given, condensed or not, for mdsStress
+        self.diss = data
+        data = mp.as_square(data)
+        mds = manifold.MDS(n_components=2, metric=True, dissimilarity="precomputed", n_init=1)
+        if init is None:
+            # A single run from the classical MDS, instead of several random starts
+            self.pos = mds.fit(data, init=mp.ClassicalMDS()(data)).embedding_
+        else:
+            self.pos = mds.fit(data, init=mp.warm_start_init(data, init)).embedding_
+            self.pos = mp.align_embedding(self.pos, init)
         return self.pos
 
     def mdsStress(self):
-        return 0
+        # Normalized stress of the last projection, sampled for large logs
+        if self.diss is None:
+            return 0
+        return mp.normalized_stress(self.diss, self.pos)
 
 
 class tsneClass(object):
     def __init__(self):
         self.pos = []
 
-    def tsneGen(self, data):
+    def tsneGen(self, data, init=None):
         print("initializing tsne")
+        data = mp.as_square(data)
         tsneAlg = manifold.TSNE(n_components=2, metric='precomputed')
-        self.pos = tsneAlg.fit(data).embedding_
+        if init is None:
+            self.pos = tsneAlg.fit(data).embedding_
+        else:
+            start = mp.warm_start_init(data, init)
+            tsneAlg.set_params(init=1e-4 * start / np.std(start[:, 0]))
+            self.pos = mp.align_embedding(tsneAlg.fit(data).embedding_, init)
         return self.pos
 
 
@@ -41,10 +63,13 @@ class spectralEmbeddingClass(object):
     def __init__(self):
         self.pos = []
 
-    def genSPE(self, data):
+    def genSPE(self, data, init=None):
+        # Not iterative, init is only used to align the result
         print("initializing Spectral Embedding")
         spe = manifold.SpectralEmbedding(n_components=2, affinity='precomputed')
-        self.pos = spe.fit(data).embedding_
+        self.pos = spe.fit(mp.as_square(data)).embedding_
+        if init is not None:
+            self.pos = mp.align_embedding(self.pos, init)
         return self.pos
 
 
@@ -56,6 +81,7 @@ class chart(object):
         self.selpoints = []
         self.selline = []
         self.chull = []
+        self.panStart = None
         self.title = title
         self.colors = [(0, 0, 1, 1), (1, 0, 0, 1), (0.48, 0.98, 0, 1)]
 
@@ -73,9 +99,7 @@ class chart(object):
         Returns:
             smallestIndex (int) - the index (into the array of points X) of the element closest to the mouse position
         """
-        distances = np.array([self.distance(self.pos[i, 0:2], event) for i in range(self.pos.shape[0])])
-        brushlist = np.where(np.logical_and(distances >= 0, distances <= 10))
-        return brushlist[0]
+        return self.index.query_radius(event.x, event.y, 10)
 
     def saveCallback(self, function):
         self.save = function
@@ -97,11 +121,17 @@ class chart(object):
                 line.remove()
             self.selpoints = []
             self.selline = []
+            self.blitManager.clear()
             self.fig.canvas.draw()
 
 
     def buttonClick(self, event):
 
+        if event.button == 2 and event.inaxes is self.ax:
+            # Middle button drag pans the view
+            self.panStart = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim())
+            return
+
         if event.button == 1 and self.clicked==False:
             print('button=%d, x=%d, y=%d, xdata=%f, ydata=%f' %
                   (event.button, event.x, event.y, event.xdata, event.ydata))
@@ -112,6 +142,11 @@ class chart(object):
             line,  = plt.plot(p[:,0], p[:,1], 'r--', c="gray", lw=2)
             self.selpoints.append(point)
             self.selline.append(line)
+            # Only the new hull point and line are drawn.
+            self.blitManager.add_artist(point)
+            self.blitManager.add_artist(line)
+            self.blitManager.update()
+            return
 
         elif event.button == 3 and len(self.chull)>0:
             self.clicked = True
@@ -125,22 +160,55 @@ class chart(object):
                 else:
                     self.coll._facecolors[k, :] = (0.75, 0.75, 0.75, 0.5)
             self.chull = []
+            # The finished hull is drawn with the rest of the chart.
+            self.blitManager.clear()
         self.fig.canvas.draw()
 
 
+    def buttonRelease(self, event):
+        if event.button == 2:
+            self.panStart = None
+
+    def mouseMove(self, event):
+        if self.panStart is None:
+            return
+        x, y, (xmin, xmax), (ymin, ymax) = self.panStart
+        dx = (event.x - x) * (xmax - xmin) / self.ax.bbox.width
+        dy = (event.y - y) * (ymax - ymin) / self.ax.bbox.height
+        self.ax.set_xlim(xmin - dx, xmax - dx)
+        self.ax.set_ylim(ymin - dy, ymax - dy)
+        self.fig.canvas.draw_idle()
+
+    def scrollZoom(self, event):
+        # Zooms in (scroll up) or out (scroll down) around the mouse cursor
+        if event.inaxes is not self.ax:
+            return
+        scale = 1.2 ** -event.step
+        xmin, xmax = self.ax.get_xlim()
+        ymin, ymax = self.ax.get_ylim()
+        self.ax.set_xlim(event.xdata - (event.xdata - xmin) * scale, event.xdata + (xmax - event.xdata) * scale)
+        self.ax.set_ylim(event.ydata - (event.ydata - ymin) * scale, event.ydata + (ymax - event.ydata) * scale)
+        self.fig.canvas.draw_idle()
+
     def drawPlot(self, size, pos, endsit):
         self.pos = np.array(pos)
         self.fig, self.ax = plt.subplots()
+        self.index = ScreenSpaceIndex(self.ax, self.pos)
+        self.blitManager = BlitManager(self.fig.canvas)
         labels = ['Aproved', 'Denied', 'Canceled']
         self.endsit = endsit
         self.coll = self.ax.scatter(pos[:, 0], pos[:, 1], c=self.endsit, cmap='brg', picker=5, alpha=0.7,
                                     edgecolors='none')
-        plt.axis([-1, 1, -1, 1])
+        # The view fits the points, the projections are not all in [-1, 1]
+        self.ax.autoscale()
         green_patch = mpatches.Patch(color='blue', label='Aproved')
         red_patch = mpatches.Patch(color='red', label='Denied')
         blue_patch = mpatches.Patch(color='lawngreen', label='Canceled')
         self.ax.legend(handles=[green_patch, red_patch, blue_patch])
         self.fig.canvas.mpl_connect('button_press_event', self.buttonClick)
+        self.fig.canvas.mpl_connect('button_release_event', self.buttonRelease)
+        self.fig.canvas.mpl_connect('motion_notify_event', self.mouseMove)
+        self.fig.canvas.mpl_connect('scroll_event', self.scrollZoom)
         self.fig.canvas.mpl_connect('key_press_event', self.keyPressed)
         plt.title(self.title)
         # plt.show()
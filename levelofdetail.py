@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This module contains the level of detail control of the charts. When too many
+points are visible, they are rendered as a binned density image instead of
+individual markers.
+"""
+
+import matplotlib
+import numpy as np
+
+
+LOD_THRESHOLD = 10000
+LOD_BINS = 200
+
+
+def density_image(points, extent, bins=LOD_BINS, labels=None, colors=None,
+                  cmap='viridis'):
+    """
+    Bins the given points and returns the density image as an RGBA array.
+
+    When labels and colors are given, each class is binned separately and the
+    color of a bin is the mean of the class colors, weighted by the number of
+    points of each class in the bin. Otherwise, the bins are colored by the
+    colormap. In both cases, the opacity of a bin grows with the logarithm of
+    its number of points, and empty bins are transparent.
+
+    Parameters
+    ----------
+    points: numpy.array
+        The Nx2 matrix of points.
+    extent: tuple
+        The (xmin, xmax, ymin, ymax) limits of the binned region.
+    bins: int or tuple
+        The number of bins along both axes, or a (nx, ny) pair.
+    labels: numpy.array
+        The class of each point, an integer in [0, len(colors)). Default is
+        None, meaning that all points belong to the same class.
+    colors: list
+        The RGBA color of each class. Only used if labels is given.
+    cmap: str or matplotlib.colors.Colormap
+        The colormap used when no labels are given.
+
+    Returns
+    -------
+    out: numpy.array
+        The (ny, nx, 4) image, with its first row at ymin.
+    """
+    nx, ny = (bins, bins) if np.isscalar(bins) else bins
+    xmin, xmax, ymin, ymax = extent
+    hist_range = ((ymin, ymax), (xmin, xmax))
+
+    points = np.asarray(points)
+    if labels is None or colors is None:
+        counts = np.histogram2d(points[:, 1], points[:, 0], bins=(ny, nx),
+                                range=hist_range)[0][np.newaxis]
+    else:
+        labels = np.asarray(labels, dtype=int)
+        counts = np.empty((len(colors), ny, nx))
+        for k in range(len(colors)):
+            in_class = points[labels == k]
+            counts[k] = np.histogram2d(in_class[:, 1], in_class[:, 0],
+                                       bins=(ny, nx), range=hist_range)[0]
+
+    total = counts.sum(axis=0)
+    peak = total.max()
+    level = np.log1p(total) / np.log1p(peak) if peak > 0 else total
+
+    if labels is None or colors is None:
+        if isinstance(cmap, str):
+            cmap = matplotlib.colormaps[cmap]
+        rgba = cmap(level)
+    else:
+        rgba = np.empty((ny, nx, 4))
+        class_rgb = np.asarray(colors, dtype=float)[:, 0:3]
+        rgba[..., 0:3] = np.tensordot(counts, class_rgb, axes=(0, 0))
+        rgba[..., 0:3] /= np.maximum(total, 1)[..., np.newaxis]
+    rgba[..., 3] = np.where(total > 0, 0.25 + 0.75 * level, 0)
+    return rgba
+
+
+class DensityLOD(object):
+    """
+    Level of detail control of a scatter plot. The points are binned into a
+    density image, covering the current view of the axes, when more than
+    threshold points are visible. The image is only a rendering of the
+    points, selections still refer to the points' indices.
+    """
+
+    def __init__(self, axes, threshold=LOD_THRESHOLD, bins=LOD_BINS):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        axes: matplotlib.Axes
+            The axes where the points are plotted.
+        threshold: int
+            The number of visible points above which the density image is
+            shown. Default is LOD_THRESHOLD.
+        bins: int or tuple
+            The number of bins of the density image. Default is LOD_BINS.
+        """
+        self._axes = axes
+        self._threshold = threshold
+        self._bins = bins
+        self._data = None
+        self._labels = None
+        self._colors = None
+        self._cmap = 'viridis'
+        self._alpha = None
+        self._image = None
+        self._active = False
+
+    @property
+    def axes(self):
+        """
+        Returns the axes associated to this object.
+        """
+        return self._axes
+
+    @property
+    def threshold(self):
+        """
+        Returns the number of visible points above which the density image
+        is shown.
+        """
+        return self._threshold
+
+    @property
+    def active(self):
+        """
+        Returns whether the density image is shown instead of the markers,
+        as decided by the last call to update.
+        """
+        return self._active
+
+    @property
+    def image(self):
+        """
+        Returns the density image artist, or None if it was not created.
+        """
+        return self._image
+
+    def set_data(self, data, labels=None, colors=None, cmap=None):
+        """
+        Sets the points to bin.
+
+        Parameters
+        ----------
+        data: numpy.array
+            The Nx2 matrix of points.
+        labels: numpy.array
+            The class of each point. Default is None.
+        colors: list
+            The RGBA color of each class. Default is None.
+        cmap: str
+            The colormap used when there are no classes. Default is None,
+            meaning that the current colormap is kept.
+        """
+        self._data = None if data is None else np.asarray(data)[:, 0:2]
+        self._labels = labels
+        self._colors = colors
+        if cmap is not None:
+            self._cmap = cmap
+
+    def set_threshold(self, threshold):
+        """
+        Sets the number of visible points above which the density image is
+        shown. Takes effect on the next update.
+        """
+        self._threshold = threshold
+
+    def set_alpha(self, alpha):
+        """
+        Sets a global opacity for the density image, on top of the per-bin
+        opacity. None restores the per-bin opacity only.
+        """
+        self._alpha = alpha
+        if self._image is not None:
+            self._image.set_alpha(alpha)
+
+    def visible_points(self):
+        """
+        Returns the indices of the points inside the current view limits.
+        """
+        if self._data is None:
+            return np.empty(0, dtype=int)
+        xmin, xmax = sorted(self.axes.get_xlim())
+        ymin, ymax = sorted(self.axes.get_ylim())
+        x = self._data[:, 0]
+        y = self._data[:, 1]
+        return np.flatnonzero((x >= xmin) & (x <= xmax) &
+                              (y >= ymin) & (y <= ymax))
+
+    def update(self, visible=None):
+        """
+        Chooses the level of detail for the current view and, if the density
+        image is needed, bins the visible points again. Must be called after
+        the data or the view limits change, before the axes are drawn.
+
+        Parameters
+        ----------
+        visible: numpy.array
+            The indices of the visible points, if already known. Default is
+            None, meaning that they are found from the view limits.
+
+        Returns
+        -------
+        out: boolean
+            True if the density image is shown, False if the markers must be
+            shown instead.
+        """
+        if visible is None:
+            visible = self.visible_points()
+        self._active = len(visible) > self.threshold
+        if not self._active:
+            if self._image is not None:
+                self._image.set_visible(False)
+            return False
+
+        extent = (tuple(sorted(self.axes.get_xlim())) +
+                  tuple(sorted(self.axes.get_ylim())))
+        labels = None if self._labels is None else self._labels[visible]
+        rgba = density_image(self._data[visible], extent, self._bins,
+                             labels, self._colors, self._cmap)
+
+        # The image is removed when the axes are cleared.
+        if self._image is None or self._image.axes is not self.axes:
+            self._image = self.axes.imshow(
+                rgba, extent=extent, origin='lower', interpolation='nearest',
+                aspect='auto', zorder=0, alpha=self._alpha)
+        else:
+            self._image.set_data(rgba)
+            self._image.set_extent(extent)
+        self._image.set_visible(True)
+        return True
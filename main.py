@@ -1,9 +1,14 @@
 
 import dataprovider
 import learn
+import mp
+import serialization
 import numpy as np
 from matplotlib import pyplot as plt
 
+# Projections computed before are loaded from here
+PROJECTION_CACHE_DIR = './projection_cache'
+
 
 if __name__ == '__main__':
 
@@ -27,22 +32,24 @@ if __name__ == '__main__':
     size = 31409
 
     #params = size of sample set and list of weight
-    data = dataprovider.DataProvider(size, weights)
-    dots = data.Calculate()
-    print(dots)
+    # single computation, no need to keep the per-feature components
+    data = dataprovider.DataProvider(size, weights, keep_components=False)
     endsit = data.GetEndSituation()
 
-    # using Multidimensional Scalling
-    mds = learn.mdsClass()
-    pos1 = mds.mdsGen(dots)
+    # using landmark Multidimensional Scalling
+    # only the distances to the landmarks are computed, not the whole matrix
+    mds = mp.LandmarkMDS()
+    pos1 = mds((data.size, data.DistanceColumns), n_components=2)
     plot1 = learn.chart("MDS")
     plot1.saveCallback(data.SaveExportedData)
     plot1.drawPlot(size,pos1,endsit)
 
     #using t-distributed stochastic neighbor embedding
     # https://en.wikipedia.org/wiki/T-distributed_stochastic_neighbor_embedding
-    tsne = learn.tsneClass()
-    pos2 = tsne.tsneGen(dots)
+    # the sparse k-nearest neighbours graph is enough for t-SNE
+    # unchanged inputs load the projection of a previous run
+    tsne = mp.TSNE(cache=serialization.ProjectionCache(cache_dir=PROJECTION_CACHE_DIR))
+    pos2 = tsne(data.CalculateKNN(), n_components=2)
     d = 2 * (pos2 - np.max(pos2)) / -np.ptp(pos2) - 1
     print(d)
     plot2 = learn.chart("t-distributed_stochastic_neighbor_embedding")
@@ -6,8 +6,474 @@ Module that defines the multidimensional projection algorithms available.
 """
 
 import numpy as np
+from scipy import sparse
+from scipy.linalg import orthogonal_procrustes
+from scipy.spatial.distance import cdist, squareform
 from sklearn import manifold
 
+import serialization
+
+
+# Maximum number of matrix entries held at once by the blockwise algorithms.
+BLOCK_ELEMENTS = 2 ** 22
+
+
+def as_square(diss_data):
+    """
+    Returns the dissimilarity matrix in square form. Matrices given in
+    condensed form (see scipy.spatial.distance.squareform) are expanded.
+    """
+    if np.ndim(diss_data) == 1:
+        return squareform(diss_data, checks=False)
+    return diss_data
+
+
+def _min_neighbors(graph):
+    """
+    Returns the smallest number of neighbours stored for a row of a sparse
+    neighbourhood graph.
+    """
+    return int(np.diff(sparse.csr_matrix(graph).indptr).min())
+
+
+def _num_objects(diss_data):
+    """
+    Returns the number of objects of a dissimilarity matrix given in square,
+    condensed or sparse form.
+    """
+    if np.ndim(diss_data) == 1:
+        return int(round((1 + np.sqrt(1 + 8 * len(diss_data))) / 2))
+    return diss_data.shape[0]
+
+
+def _nearest_placed(diss_data, m):
+    """
+    Returns, for each object i >= m of the dissimilarity matrix, the object
+    j < m with the smallest dissimilarity to it. For sparse neighbourhood
+    graphs, only the stored neighbours are considered, and -1 is returned for
+    the objects that have none among the first m.
+    """
+    n = _num_objects(diss_data)
+    if sparse.issparse(diss_data):
+        graph = sparse.csr_matrix(diss_data)
+        nearest = np.full(n - m, -1, dtype=int)
+        for i in range(m, n):
+            cols = graph.indices[graph.indptr[i]:graph.indptr[i + 1]]
+            vals = graph.data[graph.indptr[i]:graph.indptr[i + 1]]
+            placed = cols < m
+            if placed.any():
+                nearest[i - m] = cols[placed][np.argmin(vals[placed])]
+        return nearest
+    if np.ndim(diss_data) == 1:
+        # Pair (j, i), j < i, of the condensed upper triangle.
+        j = np.arange(m)
+        row_starts = j * n - j * (j + 1) // 2 - j - 1
+        return np.array([np.argmin(diss_data[row_starts + i])
+                         for i in range(m, n)], dtype=int)
+    return np.argmin(np.asarray(diss_data)[m:, :m], axis=1)
+
+
+def warm_start_init(diss_data, prev_embedding, random_state=None):
+    """
+    Builds the initial embedding of a projection from a previous one. The
+    objects are assumed to keep their order: the first rows of the
+    dissimilarity matrix are the objects of the previous embedding. These
+    keep their previous positions, while each new object is placed next to
+    its nearest previously placed object, with a small jitter so that no two
+    objects start at the same position.
+
+    Parameters
+    ----------
+    diss_data: numpy.array or scipy.sparse matrix
+        The new dissimilarity matrix, in square, condensed or sparse form.
+    prev_embedding: numpy.array
+        The previous embedding, one row per object.
+    random_state: int or numpy.random.RandomState
+        Seed of the jitter. Default is None.
+
+    Returns
+    -------
+    out: numpy.array
+        The initial embedding, with one row per object of diss_data.
+    """
+    prev_embedding = np.asarray(prev_embedding, dtype=float)
+    n = _num_objects(diss_data)
+    m = min(len(prev_embedding), n)
+    init = np.empty((n, prev_embedding.shape[1]))
+    init[:m] = prev_embedding[:m]
+    if m < n:
+        rng = np.random.RandomState(random_state) if not isinstance(
+            random_state, np.random.RandomState) else random_state
+        nearest = _nearest_placed(diss_data, m)
+        # Objects without a placed neighbour start at a random placed one.
+        missing = nearest < 0
+        nearest[missing] = rng.randint(0, m, size=missing.sum())
+        scale = 1e-3 * max(np.ptp(init[:m], axis=0).max(), np.finfo(float).eps)
+        init[m:] = init[nearest] + rng.normal(scale=scale,
+                                              size=(n - m, init.shape[1]))
+    return init
+
+
+def align_embedding(embedding, reference):
+    """
+    Rotates, reflects and translates an embedding to best match a reference
+    embedding of its first objects, so that successive projections of
+    similar data look alike. The embedding is not scaled.
+
+    Parameters
+    ----------
+    embedding: numpy.array
+        The NxD embedding to align.
+    reference: numpy.array
+        The MxD reference positions of the first M objects.
+
+    Returns
+    -------
+    out: numpy.array
+        The aligned embedding.
+    """
+    rotation, offset = _alignment(embedding, reference)
+    return embedding @ rotation + offset
+
+
+def _alignment(embedding, reference):
+    """
+    Returns the rotation and the offset of align_embedding, such that the
+    aligned embedding is embedding @ rotation + offset.
+    """
+    dims = np.shape(embedding)[1]
+    m = min(len(embedding), len(reference))
+    if m < 2:
+        return np.eye(dims), np.zeros(dims)
+    emb_mean = embedding[:m].mean(axis=0)
+    ref_mean = reference[:m].mean(axis=0)
+    rotation, _ = orthogonal_procrustes(embedding[:m] - emb_mean,
+                                        reference[:m] - ref_mean)
+    return rotation, ref_mean - emb_mean @ rotation
+
+
+def _triangulate(sq_diss, mean_sq_diss, pinv):
+    """
+    Distance based triangulation: places objects from their squared
+    dissimilarities to the reference objects of a classical scaling, x =
+    -1/2 * (delta - mean delta) @ pinv, where mean delta holds the mean
+    squared dissimilarity of each reference object and pinv the
+    pseudo-inverse of their projection.
+    """
+    return -0.5 * ((sq_diss - mean_sq_diss) @ pinv)
+
+
+def _pseudo_inverse(eigvals, eigvecs):
+    """
+    Returns the pseudo-inverse of a classical scaling projection, given by
+    its eigenvalues and eigenvectors, for _triangulate. Null eigenvalues are
+    left out.
+    """
+    pinv = np.zeros_like(eigvecs)
+    pos = eigvals > np.finfo(float).eps * max(eigvals.max(), 1)
+    pinv[:, pos] = eigvecs[:, pos] / np.sqrt(eigvals[pos])
+    return pinv
+
+
+def _interpolate(positions, new_diss, n_neighbors):
+    """
+    Places each new object at the mean position of its n_neighbors nearest
+    objects, weighted by the inverse of their dissimilarities. new_diss is
+    the MxN matrix of dissimilarities between the new objects and the N
+    positioned ones, dense or sparse. For sparse matrices, only the stored
+    dissimilarities are considered.
+    """
+    eps = np.finfo(float).eps
+    out = np.empty((new_diss.shape[0], positions.shape[1]))
+    if sparse.issparse(new_diss):
+        new_diss = sparse.csr_matrix(new_diss)
+        for i in range(new_diss.shape[0]):
+            row = slice(new_diss.indptr[i], new_diss.indptr[i + 1])
+            cols, vals = new_diss.indices[row], new_diss.data[row]
+            near = np.argsort(vals)[:n_neighbors]
+            weights = 1 / np.maximum(vals[near], eps)
+            out[i] = weights @ positions[cols[near]] / weights.sum()
+        return out
+    new_diss = np.asarray(new_diss)
+    k = min(n_neighbors, new_diss.shape[1])
+    near = np.argpartition(new_diss, k - 1, axis=1)[:, :k]
+    weights = 1 / np.maximum(np.take_along_axis(new_diss, near, axis=1), eps)
+    out[:] = np.einsum('ik,ikd->id', weights, positions[near])
+    out /= weights.sum(axis=1)[:, np.newaxis]
+    return out
+
+
+def _fingerprint(value):
+    """
+    Returns a JSON serializable fingerprint of an argument of a projection,
+    where arrays are replaced by their digests. Raises TypeError for values
+    that cannot be fingerprinted, such as functions or random generators.
+    """
+    if isinstance(value, np.ndarray) or sparse.issparse(value):
+        return {'array': serialization.array_digest(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(v) for v in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError('Cannot fingerprint a %s.' % type(value).__name__)
+
+
+def _condensed_start(i, n):
+    """
+    Returns the position of the pair (i, i + 1) in a condensed matrix of n
+    objects, the start of the row i of its upper triangle.
+    """
+    return i * n - i * (i + 1) // 2
+
+
+def _column_getter(diss_data):
+    """
+    Returns the number of objects and a function that returns the columns idx
+    of a dissimilarity matrix, as a Nxlen(idx) matrix. diss_data is either
+    such a function, taken with its number of objects from a (n, function)
+    pair, or a matrix in square or condensed form.
+    """
+    if isinstance(diss_data, tuple):
+        return diss_data
+    n = _num_objects(diss_data)
+    if np.ndim(diss_data) == 1:
+        def columns(idx):
+            # Pair (i, j) of the condensed upper triangle, i != j.
+            idx = np.asarray(idx)
+            i = np.arange(n)[:, np.newaxis]
+            lo = np.minimum(i, idx)
+            hi = np.maximum(i, idx)
+            pos = _condensed_start(lo, n) + hi - lo - 1
+            return np.where(i == idx, 0, diss_data[np.maximum(pos, 0)])
+        return n, columns
+    return n, lambda idx: np.asarray(diss_data)[:, idx]
+
+
+def _row_blocks(diss_data, block_elements=BLOCK_ELEMENTS):
+    """
+    Yields (start, stop, rows) for consecutive row blocks of a symmetric
+    dissimilarity matrix, given as for _column_getter, with at most about
+    block_elements entries per block. Memory-mapped square matrices are only
+    read one block at a time.
+    """
+    n, columns = _column_getter(diss_data)
+    square = not isinstance(diss_data, tuple) and np.ndim(diss_data) == 2
+    step = max(1, block_elements // n)
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        if square:
+            yield start, stop, np.asarray(diss_data[start:stop])
+        else:
+            yield start, stop, np.asarray(columns(np.arange(start, stop))).T
+
+
+def _maxmin_landmarks(n, columns, n_landmarks, rng):
+    """
+    Chooses landmarks by max-min sampling: starting from a random object,
+    each new landmark is the object farthest from the landmarks chosen so
+    far. Objects already chosen are excluded, so the landmarks are distinct
+    even when the remaining objects are all at distance zero from them.
+    Returns the landmarks and their Nxn_landmarks distance columns.
+    """
+    landmarks = np.empty(n_landmarks, dtype=int)
+    cols = np.empty((n, n_landmarks))
+    landmarks[0] = rng.randint(n)
+    cols[:, 0] = columns(landmarks[0:1])[:, 0]
+    min_dist = cols[:, 0].copy()
+    min_dist[landmarks[0]] = -np.inf
+    for k in range(1, n_landmarks):
+        landmarks[k] = np.argmax(min_dist)
+        cols[:, k] = columns(landmarks[k:k + 1])[:, 0]
+        np.minimum(min_dist, cols[:, k], out=min_dist)
+        min_dist[landmarks[k]] = -np.inf
+    return landmarks, cols
+
+
+def _classical_scaling(sq_diss, n_components):
+    """
+    Classical (Torgerson) scaling of a small square matrix of squared
+    dissimilarities. Returns the top n_components eigenvalues of the double
+    centered matrix, clipped at zero, and their eigenvectors.
+    """
+    b = -0.5 * (sq_diss - sq_diss.mean(axis=0) -
+                sq_diss.mean(axis=1)[:, np.newaxis] + sq_diss.mean())
+    eigvals, eigvecs = np.linalg.eigh(b)
+    top = np.argsort(eigvals)[::-1][:n_components]
+    return np.maximum(eigvals[top], 0), eigvecs[:, top]
+
+
+def _sample_rows(n, sample_size, random_state):
+    """
+    Returns the sorted rows that the quality measures are computed on: all
+    of them, or a random sample of sample_size rows if there are more.
+    """
+    if sample_size is None or sample_size >= n:
+        return np.arange(n)
+    rng = random_state if isinstance(
+        random_state, np.random.RandomState) else np.random.RandomState(
+            random_state)
+    return np.sort(rng.choice(n, sample_size, replace=False))
+
+
+def _dissimilarity_rows(diss_data, columns, rows):
+    """
+    Returns the rows of a symmetric dissimilarity matrix, given as for
+    _column_getter, as a len(rows)xN matrix.
+    """
+    if not isinstance(diss_data, tuple) and np.ndim(diss_data) == 2:
+        return np.asarray(diss_data[rows], dtype=float)
+    return np.asarray(columns(rows), dtype=float).T
+
+
+def normalized_stress(diss_data, embedding, sample_size=1000,
+                      random_state=None, block_elements=BLOCK_ELEMENTS):
+    """
+    Returns the normalized stress (Kruskal's stress-1) of an embedding,
+    sqrt(sum (d_ij - |y_i - y_j|)^2 / sum d_ij^2) over the pairs of objects.
+    Zero means that the embedding distances are the dissimilarities. For
+    large N, the sums are estimated from the pairs of a random sample of
+    objects with all objects.
+
+    Parameters
+    ----------
+    diss_data: numpy.array or tuple
+        The NxN dissimilarity matrix, its condensed upper triangle or a (N,
+        columns) pair, as for LandmarkMDS.
+    embedding: numpy.array
+        The embedding, one row per object.
+    sample_size: int
+        Number of sampled objects. Default is 1000. None uses all objects,
+        which is exact but O(N^2).
+    random_state: int or numpy.random.RandomState
+        Seed of the sample. Default is None.
+    block_elements: int
+        Maximum number of matrix entries held at once. Default is
+        BLOCK_ELEMENTS.
+
+    Returns
+    -------
+    out: float
+        The normalized stress.
+    """
+    n, columns = _column_getter(diss_data)
+    embedding = np.asarray(embedding, dtype=float)
+    rows = _sample_rows(n, sample_size, random_state)
+    step = max(1, block_elements // n)
+    residual = total = 0.0
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        diss = _dissimilarity_rows(diss_data, columns, block)
+        residual += np.square(diss - cdist(embedding[block], embedding)).sum()
+        total += np.square(diss).sum()
+    return np.sqrt(residual / total) if total > 0 else 0.0
+
+
+def neighborhood_measures(diss_data, embedding, n_neighbors=7,
+                          sample_size=1000, random_state=None,
+                          block_elements=BLOCK_ELEMENTS):
+    """
+    Returns the trustworthiness, the continuity and the k-NN preservation
+    of an embedding, for the n_neighbors nearest neighbours of each object.
+    All three are in [0, 1], and 1 means that the neighbourhoods of the
+    objects are kept.
+
+    The trustworthiness penalizes the embedding neighbours that are not
+    neighbours in the dissimilarities, by their rank in the
+    dissimilarities, and the continuity penalizes the neighbours that are
+    not kept in the embedding, by their rank in it (Venna and Kaski, 2001).
+    The k-NN preservation is the mean fraction of the neighbours that are
+    kept. For large N, they are estimated from the neighbourhoods of a
+    random sample of objects, each still ranked against all objects.
+
+    Parameters
+    ----------
+    diss_data: numpy.array or tuple
+        The NxN dissimilarity matrix, its condensed upper triangle or a (N,
+        columns) pair, as for LandmarkMDS.
+    embedding: numpy.array
+        The embedding, one row per object.
+    n_neighbors: int
+        The number of neighbours of each object, less than (2N - 1) / 3.
+        Default is 7.
+    sample_size: int
+        Number of sampled objects. Default is 1000. None uses all objects,
+        which is exact but O(N^2).
+    random_state: int or numpy.random.RandomState
+        Seed of the sample. Default is None.
+    block_elements: int
+        Maximum number of matrix entries held at once. Default is
+        BLOCK_ELEMENTS.
+
+    Returns
+    -------
+    out: tuple
+        The trustworthiness, the continuity and the k-NN preservation.
+    """
+    n, columns = _column_getter(diss_data)
+    k = n_neighbors
+    if not 0 < k < (2 * n - 1) / 3:
+        raise ValueError('n_neighbors must be in (0, (2N - 1) / 3).')
+    embedding = np.asarray(embedding, dtype=float)
+    rows = _sample_rows(n, sample_size, random_state)
+    step = max(1, block_elements // (n * k))
+    trust = cont = kept = 0.0
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        local = np.arange(len(block))[:, np.newaxis]
+        diss = _dissimilarity_rows(diss_data, columns, block)
+        dist = cdist(embedding[block], embedding)
+        # An object is not its own neighbour.
+        diss[local[:, 0], block] = np.inf
+        dist[local[:, 0], block] = np.inf
+        diss_nn = np.argpartition(diss, k - 1, axis=1)[:, :k]
+        dist_nn = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        in_diss_nn = np.zeros(diss.shape, dtype=bool)
+        in_diss_nn[local, diss_nn] = True
+        in_dist_nn = np.zeros(dist.shape, dtype=bool)
+        in_dist_nn[local, dist_nn] = True
+
+        # Rank of the neighbours in the other space, 1 for the nearest.
+        new = ~in_diss_nn[local, dist_nn]
+        ranks = (diss[:, np.newaxis, :] <
+                 diss[local, dist_nn][:, :, np.newaxis]).sum(axis=2) + 1
+        trust += ((ranks - k) * new).sum()
+        lost = ~in_dist_nn[local, diss_nn]
+        ranks = (dist[:, np.newaxis, :] <
+                 dist[local, diss_nn][:, :, np.newaxis]).sum(axis=2) + 1
+        cont += ((ranks - k) * lost).sum()
+        kept += (~new).sum()
+
+    scale = 2.0 / (len(rows) * k * (2 * n - 3 * k - 1))
+    return 1 - scale * trust, 1 - scale * cont, kept / (len(rows) * k)
+
+
+def projection_quality(diss_data, embedding, n_neighbors=7, sample_size=1000,
+                       random_state=None):
+    """
+    Returns the quality measures of an embedding, see normalized_stress and
+    neighborhood_measures, computed on the same sample of objects.
+
+    Returns
+    -------
+    out: dict
+        The 'stress', 'trustworthiness', 'continuity' and 'knn_preservation'
+        of the embedding.
+    """
+    # A fixed seed, so that both measures sample the same objects.
+    if not isinstance(random_state, (int, np.integer)):
+        rng = random_state if isinstance(
+            random_state, np.random.RandomState) else np.random.RandomState()
+        random_state = rng.randint(2 ** 31)
+    trust, cont, kept = neighborhood_measures(
+        diss_data, embedding, n_neighbors, sample_size, random_state)
+    return {'stress': normalized_stress(diss_data, embedding, sample_size,
+                                        random_state),
+            'trustworthiness': trust,
+            'continuity': cont,
+            'knn_preservation': kept}
+
 
 class BaseProjection(object):
     """
@@ -15,7 +481,7 @@ class BaseProjection(object):
     call the algorithms and to evaluate the projection's fitness.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, warm_start=False, cache=None):
         """
         Default constructor for the base projection.
 
@@ -24,9 +490,18 @@ class BaseProjection(object):
         name: str
             The name of the projection algorithm. e.g. 'MDS', 'LAMP', 'TSNE',
             etc. To be given by the inherited class.
+        warm_start: boolean
+            Switch that indicates if each call starts from the result of the
+            previous one, see warm_start_init. Default is False.
+        cache: serialization.ProjectionCache
+            Cache of the results. A call equal to a cached one, with the same
+            input, start and arguments, returns the cached result instead of
+            running the algorithm. Default is None, meaning no cache.
         """
         self._name = name
         self._proj_data = None
+        self._warm_start = warm_start
+        self._cache = cache
 
     @property
     def projected_data(self):
@@ -42,14 +517,130 @@ class BaseProjection(object):
         """
         return self._name
 
-    def calc_projection_fitness(self):
+    @property
+    def warm_start(self):
         """
-        Returns the fitness of the projection. A high fitness means that the
-        projected data corresponds well to the original data.
+        Returns whether each call starts from the previous result.
+        """
+        return self._warm_start
 
-        This method must be implemented in the subclasses.
+    @property
+    def cache(self):
+        """
+        Returns the cache of the results, or None.
         """
-        raise NotImplementedError('Method must be implemented by a subclass.')
+        return self._cache
+
+    def _cache_key(self, diss_data, init, kwargs):
+        """
+        Returns the key of a call in the cache: a fingerprint of the
+        algorithm, the input, the start (the given one or, with warm start,
+        the previous result) and the other arguments, including the random
+        seed. None if there is no cache or if the call cannot be
+        fingerprinted, e.g. with a numpy.random.RandomState as seed.
+        """
+        if self._cache is None:
+            return None
+        if not isinstance(init, str):
+            init = self._previous_embedding(init,
+                                            kwargs.get('n_components', 2))
+        try:
+            return serialization.DistanceCache.make_key(
+                name=self.name, diss_data=_fingerprint(diss_data),
+                init=_fingerprint(init),
+                kwargs=dict((k, _fingerprint(v)) for k, v in kwargs.items()))
+        except TypeError:
+            return None
+
+    def _load_cached(self, key):
+        """
+        Makes the cached result of the given key the projected data. Returns
+        False if there is no such result.
+        """
+        if key is None:
+            return False
+        proj = self._cache.load(key)
+        if proj is None:
+            return False
+        self._proj_data = proj
+        return True
+
+    def _store_cached(self, key):
+        """
+        Stores the projected data in the cache under the given key.
+        """
+        if key is not None:
+            self._cache.store(key, self._proj_data)
+
+    def _previous_embedding(self, init, n_components):
+        """
+        Returns the embedding to start from: the given one or, with warm
+        start, the previous result. None if there is none, if its number of
+        dimensions is not n_components, or if init names an initialization.
+        """
+        if isinstance(init, str):
+            return None
+        if init is None and self.warm_start:
+            init = self._proj_data
+        if init is None or np.shape(init)[1] != n_components:
+            return None
+        return np.asarray(init)
+
+    def transform(self, new_diss, n_neighbors=5):
+        """
+        Places new objects into the last projection, without fitting it
+        again. Each new object is placed at the mean position of its nearest
+        projected objects, weighted by the inverse of their dissimilarities.
+        Subclasses may place them more precisely.
+
+        Parameters
+        ----------
+        new_diss: numpy.array or scipy.sparse matrix
+            The MxN matrix of dissimilarities between the M new objects and
+            the N projected ones (see DataProvider.DistancesFrom). For sparse
+            matrices, only the stored dissimilarities are considered.
+        n_neighbors: int
+            The number of nearest projected objects. Default is 5.
+
+        Returns
+        -------
+        A numpy.array with M rows, the positions of the new objects.
+        """
+        if self._proj_data is None:
+            raise ValueError('There is no projection to place objects in.')
+        return _interpolate(self._proj_data, new_diss, n_neighbors)
+
+    def calc_projection_fitness(self, diss_data, n_neighbors=7,
+                                sample_size=1000, random_state=None):
+        """
+        Returns the fitness of the last projection, see projection_quality.
+        A low stress and high trustworthiness, continuity and k-NN
+        preservation mean that the projected data corresponds well to the
+        original data.
+
+        Parameters
+        ----------
+        diss_data: numpy.array or tuple
+            The dissimilarities of the projected objects, as given to the
+            projection (sparse neighbourhood graphs are not supported).
+        n_neighbors: int
+            The number of neighbours of each object. Default is 7.
+        sample_size: int
+            Number of sampled objects. Default is 1000. None uses all
+            objects.
+        random_state: int or numpy.random.RandomState
+            Seed of the sample. Default is None.
+
+        Returns
+        -------
+        out: dict
+            The 'stress', 'trustworthiness', 'continuity' and
+            'knn_preservation' of the projection.
+        """
+        if self._proj_data is None:
+            raise ValueError('There is no projection to evaluate.')
+        return projection_quality(diss_data, self._proj_data, n_neighbors,
+                                  sample_size, random_state)
 
 
 class MDS(BaseProjection):
@@ -64,10 +655,10 @@ class MDS(BaseProjection):
     http://scikit-learn.org/stable/modules/generated/sklearn.manifold.MDS.html
     """
 
-    def __init__(self):
-        super().__init__('MDS')
+    def __init__(self, warm_start=False, cache=None):
+        super().__init__('MDS', warm_start, cache)
 
-    def __call__(self, diss_data, **kwargs):
+    def __call__(self, diss_data, init=None, **kwargs):
         """
         Runs the MDS algorithm on the given dissimilarity matrix.
 
@@ -75,7 +666,13 @@ class MDS(BaseProjection):
         ----------
         diss_data: numpy.array
             A NxN matrix with the input dissimilarity matrix, where N is the
-            number of objects.
+            number of objects, or its condensed upper triangle.
+        init: numpy.array or str
+            A previous embedding of the first objects to start from, see
+            warm_start_init. The result is aligned to it. 'classical' starts
+            a single run from the ClassicalMDS projection, other strings are
+            passed to manifold.MDS. Default is None, meaning a random start,
+            or the previous result with warm start.
         kwargs: Other keyword arguments
             Other arguments to pass to manifold.MDS.
 
@@ -83,10 +680,81 @@ class MDS(BaseProjection):
         -------
         A numpy.array with N rows and ndims columns created by the MDS.
         """
+        key = self._cache_key(diss_data, init, kwargs)
+        if self._load_cached(key):
+            return self._proj_data
+        diss_data = as_square(diss_data)
+        if init == 'classical':
+            prev = None
+            init = ClassicalMDS()(diss_data,
+                                  n_components=kwargs.get('n_components', 2),
+                                  random_state=kwargs.get('random_state'))
+            kwargs.setdefault('n_init', 1)
+        elif isinstance(init, str):
+            # One of sklearn's own initializations.
+            prev = None
+            kwargs['init'] = init
+            init = None
+        else:
+            prev = self._previous_embedding(init,
+                                            kwargs.get('n_components', 2))
+            if prev is not None:
+                init = warm_start_init(diss_data, prev,
+                                       kwargs.get('random_state'))
+                # A single run from the given start.
+                kwargs.setdefault('n_init', 1)
+            else:
+                init = None
+
         mds = manifold.MDS(dissimilarity='precomputed', **kwargs)
-        self._proj_data = mds.fit(diss_data).embedding_
+        self._proj_data = mds.fit(diss_data, init=init).embedding_
+        if prev is not None:
+            self._proj_data = align_embedding(self._proj_data, prev)
+        self._store_cached(key)
         return self._proj_data
 
+    def transform(self, new_diss, n_neighbors=5, max_iter=30):
+        """
+        Places new objects into the last projection. Each new object starts
+        from the interpolation of BaseProjection.transform and is then moved
+        to minimize its stress against the projected objects, which stay
+        fixed (SMACOF updates of the new objects only).
+
+        Parameters
+        ----------
+        new_diss: numpy.array or scipy.sparse matrix
+            The MxN matrix of dissimilarities between the M new objects and
+            the N projected ones (see DataProvider.DistancesFrom). Sparse
+            matrices are only interpolated.
+        n_neighbors: int
+            The number of nearest projected objects of the interpolation.
+            Default is 5.
+        max_iter: int
+            The number of SMACOF updates. Default is 30.
+
+        Returns
+        -------
+        A numpy.array with M rows, the positions of the new objects.
+        """
+        new_pos = super().transform(new_diss, n_neighbors)
+        if sparse.issparse(new_diss):
+            return new_pos
+        new_diss = np.asarray(new_diss)
+        ref = self._proj_data
+        n = len(ref)
+        step = max(1, BLOCK_ELEMENTS // n)
+        for start in range(0, len(new_pos), step):
+            pos = new_pos[start:start + step]
+            for _ in range(max_iter):
+                # Guttman transform of each new object x: the mean of
+                # x_j + d_j * (x - x_j) / |x - x_j| over the projected x_j.
+                ratio = new_diss[start:start + step] / np.maximum(
+                    cdist(pos, ref), np.finfo(float).eps)
+                pos = (ref.sum(axis=0) + pos * ratio.sum(axis=1)[:, np.newaxis]
+                       - ratio @ ref) / n
+            new_pos[start:start + step] = pos
+        return new_pos
+
 
 class TSNE(BaseProjection):
     """
@@ -101,23 +769,56 @@ class TSNE(BaseProjection):
     http://scikit-learn.org/stable/modules/generated/sklearn.manifold.TSNE.html
     """
 
-    def __init__(self):
-        super().__init__('TSNE')
+    def __init__(self, warm_start=False, cache=None):
+        super().__init__('TSNE', warm_start, cache)
 
-    def __call__(self, diss_data, **kwargs):
+    def __call__(self, diss_data, init=None, **kwargs):
         """
         Runs the TSNE algorithm on the given dissimilarity matrix.
 
         Parameters
         ----------
-        data: numpy.array
+        data: numpy.array or scipy.sparse matrix
             A NxN matrix with the input dissimilarity matrix, where N is the
-            number of objects.
+            number of objects, or its condensed upper triangle. A sparse
+            matrix is taken as a k-nearest neighbours graph (see
+            DataProvider.CalculateKNN). In that case, the perplexity defaults
+            to the largest one supported by k, capped at sklearn's default.
+        init: numpy.array or str
+            A previous embedding of the first objects to start from, see
+            warm_start_init. The result is aligned to it. A string, such as
+            'random', is passed to manifold.TSNE. Default is None, meaning
+            sklearn's initialization, or the previous result with warm
+            start.
         kwargs: Other keyword arguments
             Other arguments to pass to manifold.TSNE.
         """
+        key = self._cache_key(diss_data, init, kwargs)
+        if self._load_cached(key):
+            return self._proj_data
+        if isinstance(init, str):
+            kwargs['init'] = init
+        prev = self._previous_embedding(init, kwargs.get('n_components', 2))
+        if prev is not None:
+            init = warm_start_init(diss_data, prev,
+                                   kwargs.get('random_state'))
+            # Same scale as sklearn's own initializations.
+            kwargs['init'] = 1e-4 * init / np.std(init[:, 0])
+
+        if sparse.issparse(diss_data):
+            # sklearn needs 3 * perplexity + 2 neighbours per object, and
+            # does not support the PCA initialization with distances.
+            kwargs.setdefault('perplexity',
+                              min(30.0, (_min_neighbors(diss_data) - 2) / 3))
+            kwargs.setdefault('init', 'random')
+        else:
+            diss_data = as_square(diss_data)
+
         tsne_obj = manifold.TSNE(metric='precomputed', **kwargs)
         self._proj_data = tsne_obj.fit(diss_data).embedding_
+        if prev is not None:
+            self._proj_data = align_embedding(self._proj_data, prev)
+        self._store_cached(key)
         return self._proj_data
 
 
@@ -133,27 +834,329 @@ class SpectralEmbedding(BaseProjection):
     http://scikit-learn.org/stable/modules/generated/sklearn.manifold.SpectralEmbedding.html
     """
 
-    def __init__(self):
-        super().__init__('SpectralEmbedding')
+    def __init__(self, warm_start=False, cache=None):
+        super().__init__('SpectralEmbedding', warm_start, cache)
 
-    def __call__(self, diss_data, **kwargs):
+    def __call__(self, diss_data, init=None, **kwargs):
         """
         Runs the Spectral Embedding algorithm using the given dissimilarity
         matrix as input.
 
         Parameters
         ----------
-        data: numpy.array
+        data: numpy.array or scipy.sparse matrix
             A NxN matrix with the input dissimilarity matrix, where N is the
-            number of objects.
+            number of objects, or its condensed upper triangle. A sparse
+            matrix is taken as a k-nearest neighbours graph (see
+            DataProvider.CalculateKNN), whose connectivity is used as the
+            affinity.
+        init: numpy.array
+            A previous embedding of the first objects. The algorithm has no
+            iterative start, the result is only aligned to it. Default is
+            None, or the previous result with warm start.
         kwargs: Other keyword arguments
             Other arguments to pass to manifold.SpectralEmbedding.
         """
-        tsne_obj = manifold.SpectralEmbedding(affinity='precomputed', **kwargs)
+        key = self._cache_key(diss_data, init, kwargs)
+        if self._load_cached(key):
+            return self._proj_data
+        prev = self._previous_embedding(init, kwargs.get('n_components', 2))
+        affinity = 'precomputed'
+        if sparse.issparse(diss_data):
+            affinity = 'precomputed_nearest_neighbors'
+            kwargs.setdefault('n_neighbors', _min_neighbors(diss_data))
+        else:
+            diss_data = as_square(diss_data)
+
+        tsne_obj = manifold.SpectralEmbedding(affinity=affinity, **kwargs)
         self._proj_data = tsne_obj.fit(diss_data).embedding_
+        if prev is not None:
+            self._proj_data = align_embedding(self._proj_data, prev)
+        self._store_cached(key)
         return self._proj_data
 
 
+class ClassicalMDS(BaseProjection):
+    """
+    This class runs the classical (Torgerson) multidimensional scaling
+    algorithm: the squared dissimilarity matrix is double centered and the
+    objects are placed by its top eigenvectors, scaled by the square roots
+    of their eigenvalues. The eigenvectors are found by a randomized
+    subspace iteration, which only multiplies the matrix by a few vectors,
+    one block of rows at a time, so that the centered matrix is never built
+    and the input may be memory-mapped.
+
+    References to the algorithm:
+    https://en.wikipedia.org/wiki/Multidimensional_scaling#Classical_multidimensional_scaling
+    Halko, N., Martinsson, P. G. and Tropp, J. A. Finding structure with
+    randomness. SIAM Review, 53(2), 2011.
+    """
+
+    def __init__(self, warm_start=False):
+        super().__init__('ClassicalMDS', warm_start)
+        self._triangulation = None
+
+    def __call__(self, diss_data, n_components=2, n_oversamples=10,
+                 n_iter=3, dtype=np.float32, block_elements=BLOCK_ELEMENTS,
+                 random_state=None, init=None):
+        """
+        Runs the classical MDS algorithm on the given dissimilarity matrix.
+
+        Parameters
+        ----------
+        diss_data: numpy.array or tuple
+            A NxN matrix with the input dissimilarity matrix, or its condensed
+            upper triangle, possibly memory-mapped (see
+            DataProvider.Calculate). Also a (N, columns) pair, as for
+            LandmarkMDS, in which case the columns are computed again on
+            every pass.
+        n_components: int
+            The number of dimensions of the projection. Default is 2.
+        n_oversamples: int
+            Number of extra vectors of the randomized subspace, which improve
+            the accuracy of the top eigenvectors. Default is 10.
+        n_iter: int
+            Number of subspace iterations. Each one is a pass over the
+            matrix. Default is 3.
+        dtype: numpy.dtype
+            Type of the blocks of the squared matrix. Default is float32,
+            which halves the memory traffic of each pass.
+        block_elements: int
+            Maximum number of matrix entries held at once. Default is
+            BLOCK_ELEMENTS.
+        random_state: int or numpy.random.RandomState
+            Seed of the random subspace. Default is None.
+        init: numpy.array
+            A previous embedding of the first objects. The algorithm has no
+            iterative start, the result is only aligned to it. Default is
+            None, or the previous result with warm start.
+
+        Returns
+        -------
+        A numpy.array with N rows and n_components columns.
+        """
+        n = _column_getter(diss_data)[0]
+        rng = random_state if isinstance(
+            random_state, np.random.RandomState) else np.random.RandomState(
+                random_state)
+
+        condensed = not isinstance(diss_data, tuple) and np.ndim(
+            diss_data) == 1
+
+        def squared_blocks():
+            # Row blocks of D^2. A condensed matrix gives the blocks of its
+            # strict upper triangle U, read as contiguous segments, and
+            # D^2 = U + U^T.
+            if not condensed:
+                for start, stop, rows in _row_blocks(diss_data,
+                                                     block_elements):
+                    yield start, stop, np.square(rows, dtype=dtype)
+                return
+            step = max(1, block_elements // n)
+            cols = np.arange(n)
+            for start in range(0, n, step):
+                stop = min(start + step, n)
+                rows = np.zeros((stop - start, n), dtype=dtype)
+                upper = cols > np.arange(start, stop)[:, np.newaxis]
+                rows[upper] = diss_data[_condensed_start(start, n):
+                                        _condensed_start(stop, n)]
+                yield start, stop, np.square(rows, out=rows)
+
+        row_means = np.zeros(n)
+        for start, stop, sq_rows in squared_blocks():
+            row_means[start:stop] += sq_rows.sum(axis=1, dtype=np.float64)
+            if condensed:
+                row_means += sq_rows.sum(axis=0, dtype=np.float64)
+        row_means /= n
+        grand_mean = row_means.mean()
+
+        def centered_product(vecs):
+            # B * vecs, where B = -1/2 * J D^2 J is the double centered
+            # matrix: D^2 * vecs corrected by the row and grand means.
+            out = np.zeros((n, vecs.shape[1]))
+            block_vecs = vecs.astype(dtype)
+            for start, stop, sq_rows in squared_blocks():
+                out[start:stop] += sq_rows @ block_vecs
+                if condensed:
+                    out += sq_rows.T @ block_vecs[start:stop]
+            col_sums = vecs.sum(axis=0)
+            out -= np.outer(row_means, col_sums)
+            out -= row_means @ vecs
+            out += grand_mean * col_sums
+            return -0.5 * out
+
+        k = min(n, n_components + n_oversamples)
+        basis = np.linalg.qr(centered_product(rng.normal(size=(n, k))))[0]
+        for _ in range(n_iter):
+            basis = np.linalg.qr(centered_product(basis))[0]
+        small = basis.T @ centered_product(basis)
+        eigvals, eigvecs = np.linalg.eigh((small + small.T) / 2)
+        top = np.argsort(eigvals)[::-1][:n_components]
+
+        eigvals = np.maximum(eigvals[top], 0)
+        eigvecs = basis @ eigvecs[:, top]
+        proj = eigvecs * np.sqrt(eigvals)
+
+        rotation, offset = np.eye(n_components), np.zeros(n_components)
+        prev = self._previous_embedding(init, n_components)
+        if prev is not None:
+            rotation, offset = _alignment(proj, prev)
+        # The projected objects are the references of the new ones.
+        self._triangulation = (row_means, _pseudo_inverse(eigvals, eigvecs),
+                               rotation, offset)
+        self._proj_data = proj @ rotation + offset
+        return self._proj_data
+
+    def transform(self, new_diss, n_neighbors=5):
+        """
+        Places new objects into the last projection by distance based
+        triangulation, the out-of-sample extension of classical MDS. The
+        projected objects would be placed at their own positions.
+
+        Parameters
+        ----------
+        new_diss: numpy.array
+            The MxN matrix of dissimilarities between the M new objects and
+            the N projected ones (see DataProvider.DistancesFrom).
+        n_neighbors: int
+            Ignored, the triangulation uses all projected objects. Accepted
+            for the signature of BaseProjection.transform.
+
+        Returns
+        -------
+        A numpy.array with M rows, the positions of the new objects.
+        """
+        if self._proj_data is None:
+            raise ValueError('There is no projection to place objects in.')
+        mean_sq_diss, pinv, rotation, offset = self._triangulation
+        return _triangulate(np.square(new_diss), mean_sq_diss,
+                            pinv) @ rotation + offset
+
+
+class LandmarkMDS(BaseProjection):
+    """
+    This class runs the landmark multidimensional scaling algorithm. Only the
+    dissimilarities between all objects and a few landmark objects are used:
+    the landmarks are projected by classical MDS, and every object is placed
+    by distance based triangulation from its dissimilarities to them. Time
+    and memory are O(N * L), for N objects and L landmarks.
+
+    References to the algorithm:
+    de Silva, V. and Tenenbaum, J. B. Sparse multidimensional scaling using
+    landmark points. Technical report, Stanford University, 2004.
+    """
+
+    def __init__(self, warm_start=False):
+        super().__init__('LandmarkMDS', warm_start)
+        self._landmarks = None
+        self._triangulation = None
+
+    @property
+    def landmarks(self):
+        """
+        Returns the indices of the landmarks of the last projection.
+        """
+        return self._landmarks
+
+    def __call__(self, diss_data, n_landmarks=200, landmark_selection='maxmin',
+                 n_components=2, random_state=None, init=None):
+        """
+        Runs the landmark MDS algorithm.
+
+        Parameters
+        ----------
+        diss_data: numpy.array or tuple
+            A NxN matrix with the input dissimilarity matrix, or its condensed
+            upper triangle. To avoid computing the whole matrix, a (N,
+            columns) pair, where columns(idx) returns the Nxlen(idx)
+            dissimilarities between all objects and the objects idx (see
+            DataProvider.DistanceColumns).
+        n_landmarks: int
+            The number of landmarks, at least n_components + 1. Capped at N.
+            Default is 200.
+        landmark_selection: str
+            'maxmin' to choose each landmark as the object farthest from the
+            previous ones, which spreads them over the data, or 'random'.
+            Default is 'maxmin'.
+        n_components: int
+            The number of dimensions of the projection. Default is 2.
+        random_state: int or numpy.random.RandomState
+            Seed of the landmark selection. Default is None.
+        init: numpy.array
+            A previous embedding of the first objects. The algorithm has no
+            iterative start, the result is only aligned to it. Default is
+            None, or the previous result with warm start.
+
+        Returns
+        -------
+        A numpy.array with N rows and n_components columns.
+        """
+        n, columns = _column_getter(diss_data)
+        n_landmarks = min(n_landmarks, n)
+        if n_landmarks <= n_components:
+            raise ValueError('At least n_components + 1 landmarks are needed.')
+        rng = random_state if isinstance(
+            random_state, np.random.RandomState) else np.random.RandomState(
+                random_state)
+
+        if landmark_selection == 'maxmin':
+            landmarks, cols = _maxmin_landmarks(n, columns, n_landmarks, rng)
+        elif landmark_selection == 'random':
+            landmarks = np.sort(rng.choice(n, n_landmarks, replace=False))
+            cols = np.asarray(columns(landmarks), dtype=float)
+        else:
+            raise ValueError('Unknown landmark selection: %s' %
+                             landmark_selection)
+
+        # Squared dissimilarities between the landmarks.
+        sq_cols = np.square(cols, out=cols)
+        sq_diss = sq_cols[landmarks]
+        sq_diss = (sq_diss + sq_diss.T) / 2
+        np.fill_diagonal(sq_diss, 0)
+        eigvals, eigvecs = _classical_scaling(sq_diss, n_components)
+
+        mean_sq_diss = sq_diss.mean(axis=0)
+        pinv = _pseudo_inverse(eigvals, eigvecs)
+        proj = _triangulate(sq_cols, mean_sq_diss, pinv)
+
+        # Centered, then aligned to the previous embedding.
+        rotation, offset = np.eye(n_components), -proj.mean(axis=0)
+        prev = self._previous_embedding(init, n_components)
+        if prev is not None:
+            rotation, aligned_offset = _alignment(proj + offset, prev)
+            offset = offset @ rotation + aligned_offset
+        self._landmarks = landmarks
+        self._triangulation = (mean_sq_diss, pinv, rotation, offset)
+        self._proj_data = proj @ rotation + offset
+        return self._proj_data
+
+    def transform(self, new_diss, n_neighbors=5):
+        """
+        Places new objects into the last projection by distance based
+        triangulation from the landmarks, as the projected objects were.
+
+        Parameters
+        ----------
+        new_diss: numpy.array
+            The MxN matrix of dissimilarities between the M new objects and
+            the N projected ones (see DataProvider.DistancesFrom). Only the
+            columns of the landmarks are read.
+        n_neighbors: int
+            Ignored, the triangulation uses all landmarks. Accepted for the
+            signature of BaseProjection.transform.
+
+        Returns
+        -------
+        A numpy.array with M rows, the positions of the new objects.
+        """
+        if self._proj_data is None:
+            raise ValueError('There is no projection to place objects in.')
+        mean_sq_diss, pinv, rotation, offset = self._triangulation
+        landmark_diss = np.asarray(new_diss)[:, self._landmarks]
+        return _triangulate(np.square(landmark_diss), mean_sq_diss,
+                            pinv) @ rotation + offset
+
+
 def main():
     import matplotlib.pyplot as plt
     from scipy.spatial.distance import squareform, pdist
@@ -5,21 +5,27 @@
 This module contains the classes needed to create a Qt5 based scatter chart
 using matplotlib to create the chart itself. This chart gives support for
 selecting data points both individually and in convex regions of the plane.
+The view can be zoomed (scroll wheel) and panned (middle mouse button drag),
+only the points inside the view are drawn. When too many points are visible,
+they are rendered as a density image.
 """
 
 from copy import deepcopy
 
+import matplotlib
 import numpy as np
-from matplotlib import cm
 from matplotlib.backends.backend_qt5agg import \
     FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from matplotlib.patches import Polygon
-from PyQt5.QtCore import QPoint, pyqtSignal
+from matplotlib.path import Path
+from PyQt5.QtCore import QPoint, QTimer, pyqtSignal
 from PyQt5.QtGui import QColor, QFont, QPalette
 from PyQt5.QtWidgets import QSizePolicy, QToolTip
 
+from blitmanager import BlitManager
 from brushableplot import BrushableCanvas
+from levelofdetail import LOD_THRESHOLD, DensityLOD
+from spatialindex import GridIndex, ScreenSpaceIndex
 
 
 class PolygonSelection(object):
@@ -27,17 +33,21 @@ class PolygonSelection(object):
     This class contains data about a group selection in the ScatterChart. All
     artists created by matplotlib (points and lines), as well as the points
     that compose the selection hull and the data points inside the hull are
-    stored here."
+    stored here. The data points inside the hull are kept as a boolean mask.
+    While the hull is not finished, its artists are animated by the given
+    BlitManager, if any.
     """
 
-    def __init__(self, axes, data=None):
+    def __init__(self, axes, data=None, blit_manager=None):
         self._axes = axes
         self._data = data
+        self._blit_manager = blit_manager
         self._hull_coords = []
         self._hull_points_art = []
         self._hull_lines_art = []
-        self._polygon = None
-        self._highlighted_data = []
+        self._path = None
+        self._bbox = None
+        self._mask = None
         self._point_plot_params = {'marker': '+', 'c': 'gray'}
         self._line_plot_params = {
             'linestyle': 'dashed', 'linewidth': 3.0, 'c': 'gray'}
@@ -47,10 +57,12 @@ class PolygonSelection(object):
         self._hull_coords = None
         self._point_plot_params = None
         self._line_plot_params = None
-        for art in self._hull_points_art:
-            self.axes.collections.remove(art)
-        for art in self._hull_lines_art:
-            self.axes.lines.remove(art)
+        for art in self._hull_points_art + self._hull_lines_art:
+            if self._blit_manager is not None:
+                self._blit_manager.remove_artist(art)
+            if art.axes is not None:
+                art.remove()
+        self._blit_manager = None
         self._hull_points_art = None
         self._hull_lines_art = None
 
@@ -63,15 +75,27 @@ class PolygonSelection(object):
         return self._hull_coords
 
     @property
-    def polygon(self):
-        return self._polygon
+    def path(self):
+        return self._path
+
+    @property
+    def mask(self):
+        """
+        Returns a boolean array with True for the data points inside the
+        hull, or None if the hull is not finished.
+        """
+        return self._mask
 
     @property
     def highlighted_data(self):
-        return self._highlighted_data
+        if self._mask is None:
+            return []
+        return np.flatnonzero(self._mask).tolist()
 
     def set_data(self, data):
         self._data = data
+        if self._path is not None:
+            self._mask = self._points_inside(data)
 
     def add_hull_point(self, coords):
         """
@@ -87,35 +111,66 @@ class PolygonSelection(object):
         art_p = self.axes.scatter(
             coords[0], coords[1], **self._point_plot_params)
         self._hull_points_art.append(art_p)
+        new_art = [art_p]
 
         if len(self.hull_coords) > 1:
             xcoord = [self.hull_coords[-2][0], self.hull_coords[-1][0]]
             ycoord = [self.hull_coords[-2][1], self.hull_coords[-1][1]]
             art_l = self.axes.plot(xcoord, ycoord, **self._line_plot_params)
             self._hull_lines_art.extend(art_l)
+            new_art.extend(art_l)
+
+        if self._blit_manager is not None:
+            for art in new_art:
+                self._blit_manager.add_artist(art)
 
     def finish_hull(self):
         """
         Method to close the hull and calculate the set of data points inside
-        it. Returns a list of indices of points inside the hull.
+        it. Returns a boolean mask of the points inside the hull. The hull's
+        artists are no longer animated, they are drawn on the next full draw
+        of the canvas.
         """
         # First, we close the hull.
         xcoord = [self.hull_coords[-1][0], self.hull_coords[0][0]]
         ycoord = [self.hull_coords[-1][1], self.hull_coords[0][1]]
         art_l = self.axes.plot(xcoord, ycoord, **self._line_plot_params)
         self._hull_lines_art.extend(art_l)
-        self.axes.figure.canvas.draw()
-
-        # Now we build a matplotlib.patches.Polygon and test the data points.
-        self._polygon = Polygon(np.array(self.hull_coords))
-
-        inside = []
-        for i in range(self._data.shape[0]):
-            if self.polygon.contains_point(self._data[i, :]):
-                inside.append(i)
+        if self._blit_manager is not None:
+            for art in self._hull_points_art + self._hull_lines_art:
+                self._blit_manager.remove_artist(art)
+
+        # Now we build the hull's path, kept for later tests, and test all
+        # data points at once.
+        coords = np.array(self.hull_coords)
+        self._path = Path(np.vstack([coords, coords[:1]]), closed=True)
+        self._bbox = (coords.min(axis=0), coords.max(axis=0))
+        self._mask = self._points_inside(self._data)
+        return self._mask
+
+    def contains_point(self, coords):
+        """
+        Returns whether the given point is inside the finished hull.
+        """
+        if self._path is None:
+            return False
+        coords = np.asarray(coords, dtype=float)
+        if np.any(coords < self._bbox[0]) or np.any(coords > self._bbox[1]):
+            return False
+        return bool(self._path.contains_point(coords))
 
-        self._highlighted_data = inside
-        return inside
+    def _points_inside(self, data):
+        """
+        Bulk point in polygon test. Only the points inside the hull's
+        bounding box are tested against the path.
+        """
+        mask = np.zeros(data.shape[0], dtype=bool)
+        in_bbox = np.all((data >= self._bbox[0]) & (data <= self._bbox[1]),
+                         axis=1)
+        candidates = np.flatnonzero(in_bbox)
+        if candidates.size:
+            mask[candidates] = self._path.contains_points(data[candidates])
+        return mask
 
 
 class ScatterChart(FigureCanvas, BrushableCanvas):
@@ -125,9 +180,10 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
     """
 
     MOUSE_BUTTONS = {'LEFT': 1, 'MID': 2, 'RIGHT': 3}
+    ZOOM_FACTOR = 1.2
 
     def __init__(self, canvas_name, parent, width=5, height=5, dpi=100,
-                 **kwargs):
+                 lod_threshold=LOD_THRESHOLD, **kwargs):
         """
         Default constructor.
 
@@ -145,6 +201,9 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
             The canvas height. Default value is 5 inches
         dpi: int
             The canvas' resolution. Default value is 100
+        lod_threshold: int
+            Number of visible points above which a density image is drawn
+            instead of the point markers. Default value is LOD_THRESHOLD
         kwargs:
             Other keyword arguments
         """
@@ -167,8 +226,14 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         self._xaxis_label = 'Axis 1'
         self._yaxis_label = 'Axis 2'
         self._point_names = None
-        self._point_artists = None
-        self._points_colors = {}
+        self._points_collection = None
+        self._points_colors = None
+        self._points_index = ScreenSpaceIndex(self.axes)
+        self._view_index = GridIndex()
+        self._lod = DensityLOD(self.axes, lod_threshold)
+        self._pan_start = None
+        self._hover_art = None
+        self._hover_idx = None
         self._selection_finished = False
 
         # Point plot parameters. Adding missing parameters if needed.
@@ -180,9 +245,14 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
 
         self._chulls = []
 
+        # The hovered point and the unfinished hull are redrawn over a cached
+        # copy of the static chart.
+        self._blit_manager = BlitManager(self)
+
         # Callback IDs
         self._cb_mouse_move_id = None
         self._cb_mouse_press_id = None
+        self._cb_mouse_release_id = None
         self._cb_pick_id = None
         self._cb_scrollwheel_id = None
 
@@ -268,6 +338,14 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         """
         return self._cmap_name
 
+    @property
+    def lod_threshold(self):
+        """
+        Returns the number of visible points above which the density image
+        is drawn instead of the point markers.
+        """
+        return self._lod.threshold
+
     @property
     def tooltip_enabled(self):
         """
@@ -304,8 +382,8 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         self._data = data
 
         # Reseting the highlighted data
-        self.highlight_data(self._highlighted_data,
-                            erase=True, update_chart=False)
+        self._highlighted_data.clear()
+        self._highlighted_data.resize(len(data))
 
         # Removing the existing hulls
         self._chulls = []
@@ -390,7 +468,24 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         """
         self._cmap_name = cmap_name
         if update_chart:
-            self.update_chart(data_changed=True)
+            self.update_chart(colormap_changed=True)
+
+    def set_lod_threshold(self, threshold, update_chart=True):
+        """
+        Sets the number of visible points above which the density image is
+        drawn instead of the point markers.
+
+        Parameters
+        ----------
+        threshold: int
+            The number of points. Use numpy.inf to always draw the markers.
+        update_chart: boolean
+            Switch to indicate if the plot should be updated. Default value
+            is True.
+        """
+        self._lod.set_threshold(threshold)
+        if update_chart:
+            self.update_chart()
 
     def set_tooltip_state(self, enable):
         """
@@ -413,9 +508,33 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         """
         self._region_selection_enabled = state
 
+    def reset_view(self, update_chart=True):
+        """
+        Restores the view limits that fit all the data points, undoing any
+        zoom and pan.
+
+        Parameters
+        ----------
+        update_chart: boolean
+            Switch to indicate if the plot should be updated. Default value
+            is True.
+        """
+        if self.data is None:
+            return
+        # The density image may have grown the data limits.
+        self.axes.dataLim.update_from_data_xy(self.data, ignore=True)
+        self.axes.autoscale()
+        if update_chart:
+            self._view_changed()
+
     def update_chart(self, **kwargs):
         """
         Selectively updates the plot based on the keywords arguments provided.
+        All points are drawn by a single collection, updates other than
+        data_changed only change its color array. The hovered point is drawn
+        by a separate animated collection, see cb_mouse_motion_event. The
+        level of detail is chosen again on every update, see
+        _update_level_of_detail.
 
         Parameters
         ----------
@@ -423,85 +542,111 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
             data_changed: boolean - Indicates if the data was changes since the
                                     last update.
             selection_changed: boolean - Indicates if new data were selected.
+            colormap_changed: boolean - Indicates if the colormap was changed.
         """
+        if 'data_changed' in kwargs and kwargs['data_changed'] is True:
+            self._blit_manager.clear()
+            self.axes.cla()
+            self.axes.set_title(self.plot_title)
+            self.axes.set_xlabel(self.xaxis_label)
+            self.axes.set_ylabel(self.yaxis_label)
+
+            # Picking is resolved by the spatial index, the picker parameter
+            # is the tolerance around the markers.
+            plot_params = deepcopy(self._plot_params)
+            plot_params['picker'] = self._pick_points
+            self._points_colors = self._colormap_colors()
+            self._points_collection = self.axes.scatter(
+                x=self.data[:, 0], y=self.data[:, 1], c=self._points_colors,
+                **plot_params)
+            self._points_index.set_data(self.data)
+            self._view_index.set_data(self.data)
+            self._lod.set_data(self.data, cmap=self.colormap_name)
+
+            plot_params['picker'] = None
+            plot_params['s'] = self._plot_params['s'] * 3
+            self._hover_art = self.axes.scatter(
+                x=np.empty(0), y=np.empty(0), **plot_params)
+            self._hover_idx = None
+            self._blit_manager.add_artist(self._hover_art)
+            plot_params = None
+            kwargs['selection_changed'] = True
+
+        if self._points_collection is None:
+            return
+
+        if ('colormap_changed' in kwargs and
+                kwargs['colormap_changed'] is True):
+            alpha = self._points_colors[:, 3]
+            self._points_colors = self._colormap_colors()
+            self._points_colors[:, 3] = alpha
+            self._lod.set_data(self.data, cmap=self.colormap_name)
+
         if ('selection_changed' in kwargs and
                 kwargs['selection_changed'] is True):
             # First, if there is selected data, we make the background points
             # more transparent. If there is not, we restore their full
+            # opacity. Then, we highlight the selected data with a higher
             # opacity.
             bg_alpha = 0.15
             if not self.highlighted_data:
                 bg_alpha = 1.0
-            for col in self._point_artists:
-                col.set_alpha(bg_alpha)
-
-            # Then, we highlight the selected data with a higher opacity.
-            for i in self.highlighted_data:
-                self.axes.collections[i].set_alpha(1.0)
-
-        if 'data_changed' in kwargs and kwargs['data_changed'] is True:
-            self.axes.cla()
-            self.axes.set_title(self.plot_title)
-            self.axes.set_xlabel(self.xaxis_label)
-            self.axes.set_ylabel(self.yaxis_label)
-
-            self._point_artists = [None] * self.data.shape[0]
-            colormap = cm.get_cmap(name=self.colormap_name,
-                                   lut=len(self.data))
-            self._points_colors = dict((i, colormap(i))
-                                       for i in range(len(self.data)))
+            self._points_colors[:, 3] = bg_alpha
+            self._points_colors[self.highlighted_data.indices(), 3] = 1.0
+            self._lod.set_alpha(bg_alpha if self.highlighted_data else None)
 
-            plot_params = deepcopy(self._plot_params)
-            for i, p in enumerate(self.data):
-                plot_params['c'] = self._points_colors[i]
-                self._point_artists[i] = self.axes.scatter(
-                    x=p[0], y=p[1], **plot_params)
-            plot_params = None
+        self._update_level_of_detail()
 
-            self.update_chart(selection_changed=True)
+        if self._hover_idx is not None:
+            idx = self._hover_idx
+            self._hover_art.set_facecolors(self._points_colors[idx:idx + 1])
 
         self.draw()
 
+    def schedule_notification(self, callback):
+        """
+        Delivers the parent notifications from the Qt event loop, so that
+        all selection changes made while handling an event are sent
+        together.
+        """
+        QTimer.singleShot(0, callback)
+
     def cb_mouse_motion_event(self, event):
         """
         Callback to process a mouse movement event.
 
         This method checks if the mouse cursor is over a data point and, if
         True, then it plots a tooltip (if enabled) and emits a tooltip_drawn
-        signal.
+        signal. The hovered point is enlarged by blitting, the rest of the
+        chart is not redrawn. While the middle mouse button is held, the view
+        is panned instead.
 
         Parameters
         ----------
         event: matplotlib.backend_bases.MouseEvent
             Data about the event.
         """
-        # Restoring the points' original size.
-        if self._point_artists:
-            for art in self._point_artists:
-                if art is None:
-                    continue
-                art.set_sizes([self._plot_params['s']])
+        if self._pan_start is not None:
+            self._set_hovered_point(None)
+            self._pan_view(event)
+            return False
 
         if event.xdata is None or event.ydata is None:
+            self._set_hovered_point(None)
             return False
 
         # Testing if the cursor is over a point. If it is, we plot the
         # tooltip and notify this event by calling the registered
         # callback, if any.
         if not self.point_names:
+            self._set_hovered_point(None)
             return False
         else:
-            hover_idx = None
-            for i, art in enumerate(self._point_artists):
-                if not art:
-                    continue
-                contains, _ = art.contains(event)
-                if contains:
-                    art.set_sizes([self._plot_params['s'] * 3])
-                    if i > len(self.point_names):
-                        return False
-                    hover_idx = i
-                    break
+            hover_idx = self._points_index.nearest(event.x, event.y,
+                                                   self._marker_radius())
+            self._set_hovered_point(hover_idx)
+            if hover_idx is not None and hover_idx > len(self.point_names):
+                return False
 
             if hover_idx is not None and self.tooltip_enabled:
                 palette = QPalette()
@@ -517,15 +662,14 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
             else:
                 QToolTip.hideText()
 
-        self.draw()
-
     def cb_mouse_press_event(self, event):
         """
         Process a mouse click event. Currently, this method only runs if the
         region selection is enabled. This methods adds new regions (righ  mouse
         click) or points to the current region of selection (left mouse click).
         It is also possible to delete a selection using the middle mouse
-        button.
+        button. If the region selection is disabled, the middle mouse button
+        starts panning the view.
 
         Parameters
         ----------
@@ -533,35 +677,44 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
             Data about the event
         """
         if not self.region_selection_enabled:
+            if (event.button == ScatterChart.MOUSE_BUTTONS['MID'] and
+                    event.inaxes is self.axes):
+                self._pan_start = (event.x, event.y, self.axes.get_xlim(),
+                                   self.axes.get_ylim())
             return
 
         if event.button == ScatterChart.MOUSE_BUTTONS['LEFT']:
             if not self._chulls:
-                self._chulls = [PolygonSelection(self.axes, self.data)]
+                self._chulls = [PolygonSelection(self.axes, self.data,
+                                                 self._blit_manager)]
             poly = self._chulls[-1]
             poly.add_hull_point([event.xdata, event.ydata])
+            self._blit_manager.update()
 
         elif event.button == ScatterChart.MOUSE_BUTTONS['MID']:
             idx = None
             for i, hull in enumerate(self._chulls):
-                if not hull.hull_coords:
-                    continue
-                contains = hull.polygon.contains_point(
-                    [event.xdata, event.ydata])
-                if contains:
+                if hull.contains_point([event.xdata, event.ydata]):
                     idx = i
                     break
             if idx is not None:
-                to_erase = self._chulls[idx].highlighted_data
-                self.highlight_data(to_erase, erase=True, update_chart=True)
-                del self._chulls[idx]
+                # Points also inside the other hulls remain selected.
+                hull = self._chulls.pop(idx)
+                to_erase = hull.mask & ~self._hulls_mask()
+                del hull
+                self.highlight_data(np.flatnonzero(to_erase),
+                                    erase=True, update_chart=True)
+                self.notify_parent()
 
         elif event.button == ScatterChart.MOUSE_BUTTONS['RIGHT']:
+            if not self._chulls or not self._chulls[-1].hull_coords:
+                return
             to_highlight = self._chulls[-1].finish_hull()
-            self._chulls.append(PolygonSelection(self.axes, self.data))
-            self.highlight_data(to_highlight, erase=False, update_chart=True)
-
-        self.draw()
+            self._chulls.append(PolygonSelection(self.axes, self.data,
+                                                 self._blit_manager))
+            self.highlight_data(np.flatnonzero(to_highlight),
+                                erase=False, update_chart=True)
+            self.notify_parent()
 
     def cb_pick_event(self, event):
         """
@@ -578,30 +731,151 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         """
         if self.region_selection_enabled:
             return
+        if event.artist is not self._points_collection:
+            return
         if event.mouseevent.button == ScatterChart.MOUSE_BUTTONS['LEFT']:
-            to_erase = []
-            to_highlight = []
-            for i, art in enumerate(self._point_artists):
-                contains, _ = art.contains(event.mouseevent)
-                if contains:
-                    if i in self.highlighted_data:
-                        to_erase.append(i)
-                    else:
-                        to_highlight.append(i)
-            self.highlight_data(to_erase, erase=True, update_chart=False)
-            self.highlight_data(to_highlight, erase=False, update_chart=True)
+            self.toggle_data(event.ind, update_chart=True)
             self.notify_parent()
-            self.draw()
+
+    def cb_mouse_release_event(self, event):
+        """
+        Process a mouse button release event. Releasing the middle mouse
+        button ends the panning of the view.
+
+        Parameters
+        ----------
+        event: matplotlib.backend_bases.MouseEvent
+            Data about the event
+        """
+        if event.button == ScatterChart.MOUSE_BUTTONS['MID']:
+            self._pan_start = None
 
     def cb_mouse_scroll_event(self, event):
         """
-        This method processes scroll wheel events. (zoom)
+        This method processes scroll wheel events. The view is zoomed in
+        (scroll up) or out (scroll down) by ZOOM_FACTOR per step, around the
+        mouse cursor.
+
+        Parameters
+        ----------
+        event: matplotlib.backend_bases.MouseEvent
+            Data about the event
         """
-        pass
+        if self.data is None or event.xdata is None or event.ydata is None:
+            return
+        scale = ScatterChart.ZOOM_FACTOR ** -event.step
+        xmin, xmax = self.axes.get_xlim()
+        ymin, ymax = self.axes.get_ylim()
+        self.axes.set_xlim(event.xdata - (event.xdata - xmin) * scale,
+                           event.xdata + (xmax - event.xdata) * scale)
+        self.axes.set_ylim(event.ydata - (event.ydata - ymin) * scale,
+                           event.ydata + (ymax - event.ydata) * scale)
+        self._view_changed()
 
     # ------------------------------------------------------------------------
     # Private methods
     # ------------------------------------------------------------------------
+    def _hulls_mask(self):
+        """
+        Returns the union of the masks of the finished hulls.
+        """
+        mask = np.zeros(self.data.shape[0], dtype=bool)
+        for hull in self._chulls:
+            if hull.mask is not None:
+                mask |= hull.mask
+        return mask
+
+    def _pan_view(self, event):
+        """
+        Moves the view limits by the mouse displacement since the middle
+        mouse button was pressed.
+        """
+        x, y, (xmin, xmax), (ymin, ymax) = self._pan_start
+        bbox = self.axes.bbox
+        dx = (event.x - x) * (xmax - xmin) / bbox.width
+        dy = (event.y - y) * (ymax - ymin) / bbox.height
+        self.axes.set_xlim(xmin - dx, xmax - dx)
+        self.axes.set_ylim(ymin - dy, ymax - dy)
+        self._view_changed()
+
+    def _view_changed(self):
+        """
+        Redraws the chart after its view limits changed.
+        """
+        self._update_level_of_detail()
+        self.draw()
+
+    def _visible_points(self):
+        """
+        Returns the indices of the points inside the current view, found with
+        the grid index. The view is enlarged by the marker radius, so that
+        the points partially visible on its borders are included.
+        """
+        xmin, xmax = sorted(self.axes.get_xlim())
+        ymin, ymax = sorted(self.axes.get_ylim())
+        bbox = self.axes.bbox
+        pad = self._marker_radius()
+        xpad = pad * (xmax - xmin) / max(bbox.width, 1)
+        ypad = pad * (ymax - ymin) / max(bbox.height, 1)
+        return self._view_index.query_box(xmin - xpad, xmax + xpad,
+                                          ymin - ypad, ymax + ypad)
+
+    def _update_level_of_detail(self):
+        """
+        Chooses between the point markers and the density image for the
+        current view, and sends the markers to be drawn to the points
+        collection. Only the points inside the view are drawn. When the
+        density image is shown, only the highlighted points are drawn as
+        markers, over the image.
+        """
+        shown = self._visible_points()
+        if self._lod.update(shown):
+            shown = shown[self.highlighted_data.mask[shown]]
+        self._points_collection.set_offsets(self.data[shown])
+        self._points_collection.set_facecolors(self._points_colors[shown])
+
+    def _set_hovered_point(self, idx):
+        """
+        Shows the given point enlarged, or hides the hovered point if idx is
+        None. Only the animated artists are redrawn, and only if the hovered
+        point changed.
+        """
+        if self._hover_art is None or idx == self._hover_idx:
+            return
+        self._hover_idx = idx
+        if idx is None:
+            self._hover_art.set_offsets(np.empty((0, 2)))
+        else:
+            self._hover_art.set_offsets(self.data[idx:idx + 1])
+            self._hover_art.set_facecolors(self._points_colors[idx:idx + 1])
+        self._blit_manager.update()
+
+    def _marker_radius(self):
+        """
+        Returns the radius of the point markers, in pixels.
+        """
+        return np.sqrt(self._plot_params['s']) / 2 * self.figure.dpi / 72
+
+    def _pick_points(self, artist, mouseevent):
+        """
+        Picker of the points collection. Returns the points under the mouse
+        cursor, found with the spatial index.
+        """
+        radius = (self._marker_radius() +
+                  self._plot_params['picker'] * self.figure.dpi / 72)
+        ind = self._points_index.query_radius(mouseevent.x, mouseevent.y,
+                                              radius)
+        return len(ind) > 0, dict(ind=ind)
+
+    def _colormap_colors(self):
+        """
+        Returns the Nx4 array of RGBA colors of the data points, with one
+        colormap entry per point.
+        """
+        colormap = matplotlib.colormaps[self.colormap_name].resampled(
+            len(self.data))
+        return colormap(np.arange(len(self.data)))
+
     def _connect_cb(self):
         """
         Connects the callbacks to the matplotlib canvas.
@@ -611,6 +885,8 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
             'pick_event', self.cb_pick_event)
         self._cb_mouse_press_id = fig.canvas.mpl_connect(
             'button_press_event', self.cb_mouse_press_event)
+        self._cb_mouse_release_id = fig.canvas.mpl_connect(
+            'button_release_event', self.cb_mouse_release_event)
         self._cb_mouse_move_id = fig.canvas.mpl_connect(
             'motion_notify_event', self.cb_mouse_motion_event)
         self._cb_scrollwheel_id = fig.canvas.mpl_connect(
@@ -627,6 +903,9 @@ class ScatterChart(FigureCanvas, BrushableCanvas):
         if self._cb_mouse_press_id:
             fig.canvas.mpl_disconnect(self._cb_mouse_press_id)
             self._cb_mouse_press_id = None
+        if self._cb_mouse_release_id:
+            fig.canvas.mpl_disconnect(self._cb_mouse_release_id)
+            self._cb_mouse_release_id = None
         if self._cb_scrollwheel_id:
             fig.canvas.mpl_disconnect(self._cb_scrollwheel_id)
             self._cb_scrollwheel_id = None
@@ -718,6 +997,12 @@ def main():
             print('widget {} brushed some objects.'.format(child_name))
             print('Objects:\n\t', obj_ids)
 
+        def update_brushed_data(self, child_name, added, erased, version):
+            print('widget {} brushed some objects (version {}).'.format(
+                child_name, version))
+            print('Added:\n\t', added)
+            print('Erased:\n\t', erased)
+
         def update_data(self):
             self.points = np.random.normal(size=(self.num_points, 2))
             point_names = ['Points-' + str(i + 1)
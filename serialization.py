@@ -1 +1,380 @@
-import pickle# r'C:\myname' convert to 'C:\\myname'# Save an obj usingdef SavePickleObject(pf_name, s_obj):  filename =  pf_name + '.pkl'  pfile = open(filename, 'wb')  pickle.dump(s_obj, pfile)  pfile.close()# Load object from filedef LoadPickleObject(pf_name):  try:    filename = pf_name + '.pkl'    pfile = open(filename, 'rb')    pobj = pickle.load(pfile)    pfile.close()    return pobj  except FileNotFoundError:    return None  return None
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module that stores computed data on disk, so that it can be reused between
+runs of the application instead of being computed again.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+
+_DIGESTS = {}
+
+
+# r'C:\myname' convert to 'C:\\myname'
+# Save an obj using
+def SavePickleObject(pf_name, s_obj):
+  filename =  pf_name + '.pkl'
+
+  pfile = open(filename, 'wb')
+  pickle.dump(s_obj, pfile)
+  pfile.close()
+
+# Load object from file
+def LoadPickleObject(pf_name):
+  try:
+    filename = pf_name + '.pkl'
+
+    pfile = open(filename, 'rb')
+    pobj = pickle.load(pfile)
+    pfile.close()
+    return pobj
+  except FileNotFoundError:
+    return None
+  return None
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    Returns the SHA-1 hex digest of the contents of a file. The digest is
+    memoized for as long as the file's size and modification time do not
+    change.
+
+    Parameters
+    ----------
+    path: str
+        Path to the file.
+    chunk_size: int
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    out: str
+        The hex digest of the file contents.
+    """
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _DIGESTS:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+        _DIGESTS[memo_key] = sha.hexdigest()
+    return _DIGESTS[memo_key]
+
+
+def array_digest(arr, chunk_size=1 << 20):
+    """
+    Returns the SHA-1 hex digest of the contents, shape and type of an
+    array, or of the arrays of a scipy.sparse matrix. The contents are read
+    in chunks, so memory-mapped arrays are not loaded at once.
+
+    Parameters
+    ----------
+    arr: numpy.array or scipy.sparse matrix
+        The array.
+    chunk_size: int
+        Number of bytes hashed at a time.
+
+    Returns
+    -------
+    out: str
+        The hex digest of the array.
+    """
+    sha = hashlib.sha1()
+    if sparse.issparse(arr):
+        arr = sparse.csr_matrix(arr)
+        sha.update(json.dumps(['csr', list(arr.shape)]).encode('utf-8'))
+        parts = (arr.data, arr.indices, arr.indptr)
+    else:
+        parts = (arr,)
+    for part in parts:
+        part = np.asarray(part)
+        sha.update(json.dumps([list(part.shape),
+                               part.dtype.str]).encode('utf-8'))
+        flat = part.reshape(-1)
+        step = max(1, chunk_size // max(1, part.itemsize))
+        for start in range(0, flat.size, step):
+            sha.update(np.ascontiguousarray(flat[start:start + step]))
+    return sha.hexdigest()
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'source_size': st.st_size, 'source_mtime_ns': st.st_mtime_ns}
+
+
+def save_columns(dir_path, columns, source_path):
+    """
+    Stores a table as a directory holding one .npy file per column, built
+    from the given source file. String columns are stored as fixed width
+    arrays, so they can be memory-mapped too.
+
+    Parameters
+    ----------
+    dir_path: str
+        The directory to store the columns in. Created if needed.
+    columns: dict
+        The column arrays, by name.
+    source_path: str
+        The file the columns were read from. The stored table is valid
+        while this file is not modified.
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    meta_path = os.path.join(dir_path, 'meta.json')
+    # The metadata marks a complete table, so it is removed first and
+    # written last.
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, arr in columns.items():
+        np.save(os.path.join(dir_path, name + '.npy'), np.asarray(arr))
+    meta = _source_stamp(source_path)
+    meta['columns'] = sorted(columns)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def load_columns(dir_path, source_path):
+    """
+    Loads a table stored by save_columns, memory-mapping its columns.
+
+    Parameters
+    ----------
+    dir_path: str
+        The directory of the stored table.
+    source_path: str
+        The file the table was built from.
+
+    Returns
+    -------
+    out: dict or None
+        The column arrays by name, or None if there is no stored table or
+        if the source file changed since it was stored.
+    """
+    try:
+        with open(os.path.join(dir_path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        stamp = _source_stamp(source_path)
+        if any(meta.get(k) != v for k, v in stamp.items()):
+            return None
+        return dict((name, np.load(os.path.join(dir_path, name + '.npy'),
+                                   mmap_mode='r'))
+                    for name in meta['columns'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class DistanceCache(object):
+    """
+    Content addressed cache of numpy arrays. Each entry is stored as a .npy
+    file named after its key and is memory-mapped when loaded. When the
+    total size of the entries exceeds the given limit, the least recently
+    used entries are removed.
+
+    Loaded arrays are mapped copy-on-write: like a freshly computed array,
+    they can be modified in place, and the changes never reach the stored
+    entry.
+    """
+
+    def __init__(self, cache_dir, max_bytes=8 * 1024 ** 3):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        cache_dir: str
+            Directory where the entries are stored. Created if needed.
+        max_bytes: int
+            Maximum total size of the entries, in bytes. Default is 8 GB,
+            two condensed float64 matrices of the full event log.
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def cache_dir(self):
+        """
+        Returns the directory of the cache entries.
+        """
+        return self._cache_dir
+
+    @property
+    def max_bytes(self):
+        """
+        Returns the size limit of the cache, in bytes.
+        """
+        return self._max_bytes
+
+    @staticmethod
+    def make_key(**parts):
+        """
+        Builds a key from the given JSON serializable values. Equal values
+        give equal keys, regardless of the order of the arguments.
+
+        Returns
+        -------
+        out: str
+            The key, a hex digest.
+        """
+        text = json.dumps(parts, sort_keys=True)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        """
+        Returns the array stored under the given key, memory-mapped copy on
+        write, or None if there is no such entry.
+        """
+        path = self._entry_path(key)
+        try:
+            arr = np.load(path, mmap_mode='c')
+        except (FileNotFoundError, ValueError):
+            return None
+        # The modification time marks the last use of the entry.
+        os.utime(path)
+        return arr
+
+    def store(self, key, arr):
+        """
+        Stores the array under the given key and evicts the least recently
+        used entries if the cache grew beyond its limit. An array larger
+        than the limit is not stored, with a warning.
+
+        Returns
+        -------
+        out: bool
+            Whether the array was stored.
+        """
+        if arr.nbytes > self.max_bytes:
+            warnings.warn('Not caching an array of %d bytes, the cache limit '
+                          'is %d bytes.' % (arr.nbytes, self.max_bytes))
+            return False
+        path = self._entry_path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp_path, path)
+        self.evict(keep=key)
+        return True
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the total size of the
+        cache is within its limit. The entry given by keep is never removed.
+        """
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith('.npy'):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, fname))
+            entries.append((st.st_mtime_ns, st.st_size, fname))
+
+        total = sum(e[1] for e in entries)
+        for _, nbytes, fname in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and fname == keep + '.npy':
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, fname))
+            except OSError:
+                # Still mapped by another process on some platforms.
+                continue
+            total -= nbytes
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + '.npy')
+
+
+class ProjectionCache(object):
+    """
+    Cache of projection results. The most recently used results are kept in
+    memory and, optionally, every result is also stored on disk as a .npy
+    file (see DistanceCache), so that it survives between runs. The results
+    are copied in and out of the cache, so they can be modified freely.
+    """
+
+    def __init__(self, max_entries=16, cache_dir=None,
+                 max_bytes=256 * 1024 ** 2):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        max_entries: int
+            Maximum number of results kept in memory. The least recently
+            used ones are dropped first.
+        cache_dir: str
+            Directory of the results stored on disk. Default is None,
+            meaning that the results are only kept in memory.
+        max_bytes: int
+            Maximum total size of the results stored on disk, in bytes.
+        """
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._disk = None
+        if cache_dir is not None:
+            self._disk = DistanceCache(cache_dir, max_bytes)
+
+    @property
+    def max_entries(self):
+        """
+        Returns the maximum number of results kept in memory.
+        """
+        return self._max_entries
+
+    @property
+    def disk(self):
+        """
+        Returns the DistanceCache of the results stored on disk, or None.
+        """
+        return self._disk
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, key):
+        """
+        Returns a copy of the result stored under the given key, or None if
+        there is no such result in memory or on disk.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key].copy()
+        if self._disk is None:
+            return None
+        arr = self._disk.load(key)
+        if arr is None:
+            return None
+        self._remember(key, np.array(arr))
+        return self._entries[key].copy()
+
+    def store(self, key, arr):
+        """
+        Stores a copy of a result under the given key, in memory and, if
+        enabled, on disk.
+        """
+        self._remember(key, np.array(arr))
+        if self._disk is not None:
+            self._disk.store(key, self._entries[key])
+
+    def clear(self):
+        """
+        Drops the results kept in memory. The results on disk are kept.
+        """
+        self._entries.clear()
+
+    def _remember(self, key, arr):
+        self._entries[key] = arr
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
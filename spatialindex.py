@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+This module contains the spatial indices of the charts' data points. One
+works in screen space and finds the points under the mouse cursor, the other
+works in data space and finds the points inside the current view, without
+testing every point.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class ScreenSpaceIndex(object):
+    """
+    KD-tree over the display coordinates of the data points plotted in an
+    axes. The tree is built lazily and rebuilt whenever the data or the
+    axes' data-to-display transform (limits, figure size, dpi) changes.
+    """
+
+    def __init__(self, axes, data=None):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        axes: matplotlib.Axes
+            The axes where the points are plotted.
+        data: numpy.array
+            The Nx2 matrix of points in data coordinates. Default is None.
+        """
+        self._axes = axes
+        self._data = None
+        self._tree = None
+        self._transform_key = None
+        self.set_data(data)
+
+    @property
+    def axes(self):
+        """
+        Returns the axes associated to this index.
+        """
+        return self._axes
+
+    @property
+    def data(self):
+        """
+        Returns the indexed points, in data coordinates.
+        """
+        return self._data
+
+    def set_data(self, data, axes=None):
+        """
+        Sets the indexed points. The tree is built on the next query.
+
+        Parameters
+        ----------
+        data: numpy.array
+            The Nx2 matrix of points in data coordinates.
+        axes: matplotlib.Axes
+            The axes where the points are plotted, if it changed.
+        """
+        if axes is not None:
+            self._axes = axes
+        self._data = None if data is None else np.asarray(data)[:, 0:2]
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces the tree to be rebuilt on the next query.
+        """
+        self._tree = None
+        self._transform_key = None
+
+    def query_radius(self, x, y, radius):
+        """
+        Returns the indices of the points within the given distance of a
+        display position, in ascending order.
+
+        Parameters
+        ----------
+        x, y: float
+            The display coordinates, in pixels (e.g. MouseEvent.x and .y).
+        radius: float
+            The distance, in pixels.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices of the points found.
+        """
+        tree = self._get_tree()
+        if tree is None:
+            return np.empty(0, dtype=int)
+        return np.sort(np.asarray(tree.query_ball_point((x, y), radius),
+                                  dtype=int))
+
+    def nearest(self, x, y, max_dist=np.inf):
+        """
+        Returns the index of the point closest to a display position, or
+        None if no point is within max_dist pixels.
+        """
+        tree = self._get_tree()
+        if tree is None:
+            return None
+        dist, idx = tree.query((x, y), distance_upper_bound=max_dist)
+        if not np.isfinite(dist):
+            return None
+        return int(idx)
+
+    def _get_tree(self):
+        """
+        Returns the tree, building it if the data or the transform changed.
+        """
+        if self._data is None or not len(self._data):
+            return None
+        transform = self.axes.transData
+        key = transform.get_affine().get_matrix().tobytes()
+        if self._tree is None or key != self._transform_key:
+            self._tree = cKDTree(transform.transform(self._data))
+            self._transform_key = key
+        return self._tree
+
+
+class GridIndex(object):
+    """
+    Uniform grid over the data coordinates of a set of points. The points are
+    sorted by grid cell, so the points of a row of cells are contiguous and a
+    rectangular query only tests the points of the cells it overlaps. Used to
+    find the points inside the current view of a chart.
+    """
+
+    def __init__(self, data=None, points_per_cell=16):
+        """
+        Default constructor.
+
+        Parameters
+        ----------
+        data: numpy.array
+            The Nx2 matrix of points in data coordinates. Default is None.
+        points_per_cell: int
+            The mean number of points per cell the grid is sized for.
+        """
+        self._points_per_cell = points_per_cell
+        self._data = None
+        self._order = None
+        self._cell_starts = None
+        self._origin = None
+        self._cell_size = None
+        self._shape = None
+        self.set_data(data)
+
+    @property
+    def data(self):
+        """
+        Returns the indexed points, in data coordinates.
+        """
+        return self._data
+
+    def set_data(self, data):
+        """
+        Sets the indexed points and builds the grid.
+
+        Parameters
+        ----------
+        data: numpy.array
+            The Nx2 matrix of points in data coordinates.
+        """
+        if data is None or not len(data):
+            self._data = None
+            return
+        self._data = np.asarray(data)[:, 0:2]
+        lo = self._data.min(axis=0)
+        extent = np.maximum(self._data.max(axis=0) - lo, np.finfo(float).eps)
+
+        # Square cells, sized so that a cell holds points_per_cell points on
+        # average.
+        n_cells = max(1, len(self._data) // self._points_per_cell)
+        cell_size = np.sqrt(extent[0] * extent[1] / n_cells)
+        cell_size = max(cell_size, extent.max() / n_cells)
+        shape = np.minimum(np.floor(extent / cell_size).astype(int) + 1,
+                           n_cells)
+
+        cells = self._cells_of(self._data, lo, cell_size, shape)
+        cell_ids = cells[:, 1] * shape[0] + cells[:, 0]
+        self._order = np.argsort(cell_ids, kind='stable')
+        self._cell_starts = np.searchsorted(cell_ids[self._order],
+                                            np.arange(shape[0] * shape[1] + 1))
+        self._origin = lo
+        self._cell_size = cell_size
+        self._shape = shape
+
+    def query_box(self, xmin, xmax, ymin, ymax):
+        """
+        Returns the indices of the points inside a rectangle, in ascending
+        order.
+
+        Parameters
+        ----------
+        xmin, xmax, ymin, ymax: float
+            The limits of the rectangle, in data coordinates.
+
+        Returns
+        -------
+        out: numpy.array
+            The indices of the points found.
+        """
+        if self._data is None:
+            return np.empty(0, dtype=int)
+        xmin, xmax = sorted((xmin, xmax))
+        ymin, ymax = sorted((ymin, ymax))
+        first, last = self._cells_of(np.array([[xmin, ymin], [xmax, ymax]]),
+                                     self._origin, self._cell_size,
+                                     self._shape)
+
+        # Each row of cells in the box is a contiguous run of points.
+        nx = self._shape[0]
+        rows = np.arange(first[1], last[1] + 1)
+        starts = self._cell_starts[rows * nx + first[0]]
+        stops = self._cell_starts[rows * nx + last[0] + 1]
+        candidates = np.concatenate(
+            [self._order[a:b] for a, b in zip(starts, stops)] +
+            [np.empty(0, dtype=int)])
+
+        pts = self._data[candidates]
+        inside = ((pts[:, 0] >= xmin) & (pts[:, 0] <= xmax) &
+                  (pts[:, 1] >= ymin) & (pts[:, 1] <= ymax))
+        return np.sort(candidates[inside])
+
+    @staticmethod
+    def _cells_of(points, origin, cell_size, shape):
+        cells = np.floor((points - origin) / cell_size)
+        return np.clip(cells, 0, shape - 1).astype(int)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the root of the repository.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import casedata
+
+
+NUM_VARIANTS = 6
+LOAN_GOALS = ['Car', 'Homeimprovement', 'Unknown']
+
+
+def MakeCases(size, seed=0):
+    # Random cases with repeated values, as in the event log.
+    rng = np.random.RandomState(seed)
+    return casedata.CaseTable(np.array(['Application_%d' % i for i in range(size)]),
+                              rng.randint(0, 3, size),
+                              rng.choice([5000.0, 10000.0, 15000.0, 20000.0], size),
+                              rng.choice([0.0, 650.0, 800.0, 979.0], size),
+                              rng.randint(1, NUM_VARIANTS + 1, size),
+                              rng.randint(1, 4, size).astype(float),
+                              rng.randint(0, len(LOAN_GOALS), size),
+                              np.array(LOAN_GOALS))
+
+
+def MakeVariantMatrix(seed):
+    rng = np.random.RandomState(seed)
+    m = rng.rand(NUM_VARIANTS, NUM_VARIANTS)
+    m = (m + m.T) / 2
+    np.fill_diagonal(m, 0)
+    return m
+
+
+@pytest.fixture
+def cases():
+    return MakeCases(40)
+
+
+@pytest.fixture
+def coefs(cases):
+    cf = casedata.CaseDataCoeficients()
+    cf.set_coefs([1.0, 0.5, 0.3, 0.5, 0.7, 1.0])
+    casedata.UpdateMaxValues(len(cases), cases, cf)
+    return cf
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # Case file and variant matrices of DataProvider, in the working
+    # directory where it reads them.
+    table = MakeCases(60, seed=1)
+    with open(tmp_path / 'case_data.txt', 'w') as f:
+        f.write('CaseName\tEndPointSituation\tRequestAmount\tCreditScore\tVariant\tNumberOfOffers\tLoanGoal\n')
+        for i in range(len(table)):
+            case = table.GetCase(i)
+            f.write('%s\t%d\t%r\t%r\t%d\t%r\t%s\n' % (case.casename, case.endsituation, case.requestamount, case.creditscore,
+                                                     case.variant, case.numberofoffers, case.loangoal))
+    np.savetxt(tmp_path / 'editDist.csv', MakeVariantMatrix(2), delimiter=';', fmt='%.4f')
+    np.savetxt(tmp_path / 'all_SimilarityMatrix.csv', MakeVariantMatrix(3), delimiter=';', fmt='%.4f')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,31 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from blitmanager import BlitManager
+
+
+class NoBlitCanvas(FigureCanvasAgg):
+    supports_blit = False
+
+
+def Render(canvas_class, with_line):
+    fig = Figure(figsize=(2, 2), dpi=50)
+    canvas = canvas_class(fig)
+    axes = fig.add_subplot(111)
+    axes.set_xlim(0, 1)
+    axes.set_ylim(0, 1)
+    manager = BlitManager(canvas)
+    canvas.draw()
+    if with_line:
+        line, = axes.plot([0, 1], [0, 1], linewidth=4, c='red')
+        manager.add_artist(line)
+        assert line.get_animated() == canvas.supports_blit
+    manager.update()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+def test_update_draws_the_artists():
+    for canvas_class in (FigureCanvasAgg, NoBlitCanvas):
+        # The red line shows up after an update, with or without blitting.
+        assert not np.array_equal(Render(canvas_class, True), Render(canvas_class, False))
@@ -0,0 +1,103 @@
+import numpy as np
+
+from brushableplot import BrushableCanvas, SelectionModel
+
+
+class Parent(object):
+    def __init__(self):
+        self.calls = []
+
+    def update_brushed_data(self, name, added, erased, version):
+        self.calls.append((name, added.tolist(), erased.tolist(), version))
+
+
+class ListParent(object):
+    def __init__(self):
+        self.calls = []
+
+    def set_brushed_data(self, name, indices):
+        self.calls.append((name, indices))
+
+
+class Canvas(BrushableCanvas):
+    # Notifications are delivered when flushed by the test, as an event
+    # loop would.
+    def __init__(self, parent):
+        super().__init__('canvas', parent)
+        self.scheduled = []
+
+    def schedule_notification(self, callback):
+        self.scheduled.append(callback)
+
+    def update_chart(self, **kwargs):
+        pass
+
+    def change(self, *changes):
+        # Each change is followed by a notification, as in the charts'
+        # event handlers.
+        for function, args in changes:
+            function(*args)
+            self.notify_parent()
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for callback in scheduled:
+            callback()
+
+
+def test_version_counts_changes_only():
+    sel = SelectionModel(5)
+    assert sel.version == 0
+    np.testing.assert_array_equal(sel.add([1, 3, 3]), [1, 3])
+    assert sel.version == 1 and len(sel) == 2
+    assert sel.add([1, 3]).size == 0
+    assert sel.remove([0, 4]).size == 0
+    assert sel.clear().size == 2
+    assert sel.version == 2
+    assert sel.clear().size == 0
+    assert sel.version == 2
+    np.testing.assert_array_equal(sel.toggle([0, 2]), [0, 2])
+    np.testing.assert_array_equal(sel.toggle([2, 7]), [2, 7])
+    assert sel.version == 4 and sel.size == 8
+    assert list(sel) == [0, 7] and 7 in sel and 2 not in sel
+    np.testing.assert_array_equal(sel.resize(4), [7])
+    assert sel.version == 5 and list(sel) == [0]
+    assert not sel.mask.flags.writeable
+
+
+def test_notifications_are_coalesced_deltas():
+    parent = Parent()
+    canvas = Canvas(parent)
+    canvas.change((canvas.highlight_data, ([1, 2, 3], False)),
+                  (canvas.highlight_data, ([2], True)),
+                  (canvas.toggle_data, ([5, 1],)))
+    # Several changes, a single notification.
+    assert len(canvas.scheduled) == 1
+    canvas.run_scheduled()
+    assert parent.calls == [('canvas', [3, 5], [], 3)]
+
+    canvas.change((canvas.highlight_data, ([3], True)),
+                  (canvas.highlight_data, ([6], False)))
+    canvas.run_scheduled()
+    assert parent.calls[-1] == ('canvas', [6], [3], 5)
+
+    # Changes that cancel out are not notified.
+    canvas.change((canvas.highlight_data, ([9], False)),
+                  (canvas.highlight_data, ([9], True)))
+    canvas.run_scheduled()
+    assert len(parent.calls) == 2
+
+    # Indices beyond a shrunk selection are erased.
+    canvas.highlighted_data.resize(6)
+    canvas.notify_parent()
+    canvas.run_scheduled()
+    assert parent.calls[-1][1:3] == ([], [6])
+
+
+def test_parent_without_deltas_gets_the_full_list():
+    parent = ListParent()
+    canvas = Canvas(parent)
+    canvas.change((canvas.highlight_data, ([4, 2], False)),
+                  (canvas.highlight_data, ([4], True)))
+    canvas.run_scheduled()
+    assert parent.calls == [('canvas', [2])]
@@ -0,0 +1,37 @@
+import numpy as np
+
+import casedata
+from conftest import MakeVariantMatrix
+
+
+def test_composite_distance_block_matches_pairwise(cases, coefs):
+    jaccard = MakeVariantMatrix(2)
+    editdist = MakeVariantMatrix(3)
+    block = casedata.CompositeDistanceBlock(cases[0:15], cases, coefs, jaccard, editdist)
+    assert block.shape == (15, len(cases))
+    for i in range(15):
+        a = cases.GetCase(i)
+        for j in range(len(cases)):
+            b = cases.GetCase(j)
+            var = (a.variant - 1, b.variant - 1)
+            expected = casedata.CompositeDistance(a, b, coefs, jaccard[var], editdist[var])
+            # One ulp of the product of exponentials, which is at most 1.
+            assert abs(block[i, j] - expected) <= np.spacing(1.0)
+
+
+def test_combined_components_match_block(cases, coefs):
+    jaccard = MakeVariantMatrix(2)
+    editdist = MakeVariantMatrix(3)
+    comps = casedata.CompositeComponentsBlock(cases, cases, coefs, jaccard, editdist)
+    np.testing.assert_allclose(casedata.CombineComponents(comps, coefs),
+                               casedata.CompositeDistanceBlock(cases, cases, coefs, jaccard, editdist),
+                               rtol=1e-12, atol=1e-15)
+
+
+
+def test_recode_loan_goals_keeps_names(cases):
+    names = np.array(['Unknown', 'Car', 'Boat', 'Homeimprovement'])
+    recoded = casedata.RecodeLoanGoals(cases, names)
+    assert list(recoded.loangoal_names[:4]) == list(names)
+    for i in range(len(cases)):
+        assert recoded.loangoal_names[recoded.loangoal[i]] == cases.loangoal_names[cases.loangoal[i]]
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import squareform
+
+import casedata
+import dataprovider
+
+
+WEIGHTS = [1.0, 0.5, 0.3, 0.5, 0.7, 1.0]
+
+
+@pytest.fixture
+def provider(data_dir):
+    data = dataprovider.DataProvider(50, WEIGHTS, cache_dir=None, processes=2)
+    yield data
+    data.Close()
+
+
+def BruteForce(data):
+    cases = data.casedata_v[:data.size]
+    full = casedata.CompositeDistanceBlock(cases, cases, data.caseDataCoefs, data.jaccard, data.editDist)
+    np.fill_diagonal(full, 0)
+    return full
+
+
+def test_condensed_matches_square(provider):
+    cond = provider.Calculate(condensed=True)
+    full = provider.Calculate()
+    assert cond.shape == (50 * 49 // 2,)
+    np.testing.assert_array_equal(squareform(cond, checks=False), full)
+    np.testing.assert_allclose(full, BruteForce(provider), rtol=1e-12, atol=1e-15)
+
+
+def test_knn_matches_brute_force(provider):
+    k = 6
+    graph = provider.CalculateKNN(k)
+    full = BruteForce(provider)
+    assert graph.shape == (50, 50)
+    for i in range(50):
+        row = graph.getrow(i)
+        others = np.delete(full[i], i)
+        # The k smallest distances to the other cases, ties in any order.
+        np.testing.assert_allclose(np.sort(row.data), np.sort(others)[:k], rtol=1e-12)
+        np.testing.assert_allclose(row.data, full[i, row.indices], rtol=1e-12)
+        assert i not in row.indices
+
+
+
+@pytest.mark.parametrize('size, k', [(1, 6), (50, 0)])
+def test_knn_needs_a_neighbour(provider, size, k):
+    provider.SetSize(size)
+    with pytest.raises(ValueError):
+        provider.CalculateKNN(k)
+
+
+@pytest.mark.parametrize('keep_components', [True, False])
+def test_grown_matrix_matches_fresh_provider(data_dir, keep_components):
+    grown = dataprovider.DataProvider(20, WEIGHTS, keep_components=keep_components, cache_dir=None, processes=2)
+    try:
+        grown.Calculate(condensed=True)
+        grown.SetSize(50)
+        larger = grown.Calculate(condensed=True)
+        grown.SetSize(30)
+        smaller = grown.Calculate(condensed=True)
+    finally:
+        grown.Close()
+
+    for size, cond in ((50, larger), (30, smaller)):
+        fresh = dataprovider.DataProvider(size, WEIGHTS, keep_components=keep_components, cache_dir=None, processes=2)
+        try:
+            np.testing.assert_array_equal(cond, fresh.Calculate(condensed=True))
+        finally:
+            fresh.Close()
+
+
+def test_components_are_dropped_above_the_limit(provider, monkeypatch):
+    # The components of 20 cases fit, those of 50 do not.
+    monkeypatch.setattr(dataprovider, 'COMPONENTS_MAX_BYTES', 6 * 400 * 8)
+    provider.SetSize(20)
+    small = provider.Calculate(condensed=True)
+    assert provider.keep_components
+    provider.SetSize(50)
+    full = provider.Calculate()
+    assert not provider.keep_components
+    assert provider.kept.shape == (50 * 49 // 2,)
+    np.testing.assert_allclose(full, BruteForce(provider), rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(squareform(full[:20, :20], checks=False), small, rtol=1e-12, atol=1e-15)
+
+def test_distances_from_loaded_cases(provider):
+    full = provider.Calculate()
+    cases = provider.casedata_v[:10]
+    np.testing.assert_allclose(provider.DistancesFrom(cases), full[:10], atol=1e-12)
+    np.testing.assert_allclose(provider.DistancesFrom(cases, [3, 7, 1]), full[:10][:, [3, 7, 1]], atol=1e-12)
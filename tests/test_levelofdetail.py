@@ -0,0 +1,42 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import levelofdetail
+
+
+def test_density_image_colormap():
+    points = np.random.RandomState(0).rand(100, 2)
+    rgba = levelofdetail.density_image(points, (0, 1, 0, 1), (50, 40))
+    assert rgba.shape == (40, 50, 4)
+    counts = np.histogram2d(points[:, 1], points[:, 0], bins=(40, 50), range=((0, 1), (0, 1)))[0]
+    # Empty bins are transparent, the others at least 0.25 opaque.
+    np.testing.assert_array_equal(rgba[..., 3] > 0, counts > 0)
+    assert rgba[..., 3][counts > 0].min() >= 0.25
+
+
+def test_density_image_class_colors():
+    points = np.array([[0.1, 0.1], [0.1, 0.1], [0.9, 0.9]])
+    colors = [(1, 0, 0, 1), (0, 0, 1, 1)]
+    rgba = levelofdetail.density_image(points, (0, 1, 0, 1), 2, labels=np.array([0, 1, 1]), colors=colors)
+    np.testing.assert_allclose(rgba[0, 0, 0:3], (0.5, 0, 0.5))
+    np.testing.assert_allclose(rgba[1, 1, 0:3], (0, 0, 1))
+    assert rgba[0, 1, 3] == 0
+
+
+def test_density_lod_renders_image():
+    fig = Figure()
+    canvas = FigureCanvasAgg(fig)
+    axes = fig.add_subplot(111)
+    data = np.random.RandomState(1).rand(500, 2)
+    axes.scatter(data[:, 0], data[:, 1])
+    lod = levelofdetail.DensityLOD(axes, threshold=100, bins=20)
+    lod.set_data(data, cmap='viridis')
+    assert lod.update()
+    assert lod.image.get_visible()
+    canvas.draw()
+    assert lod.image.get_array().shape == (20, 20, 4)
+
+    lod.set_threshold(1000)
+    assert not lod.update()
+    assert not lod.image.get_visible()
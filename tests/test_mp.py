@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist, pdist, squareform
+
+import mp
+
+
+def euclidean(points):
+    return squareform(pdist(points))
+
+
+@pytest.mark.parametrize('diss', [
+    np.zeros((30, 30)),
+    # Every point twice, so half of the min-distances reach zero.
+    euclidean(np.repeat(np.random.RandomState(0).rand(10, 2), 2, axis=0)),
+])
+def test_maxmin_landmarks_are_distinct(diss):
+    n = len(diss)
+    for n_landmarks in (5, n):
+        landmarks, cols = mp._maxmin_landmarks(n, lambda idx: diss[:, idx], n_landmarks, np.random.RandomState(1))
+        assert len(np.unique(landmarks)) == n_landmarks
+        np.testing.assert_array_equal(cols, diss[:, landmarks])
+
+
+def test_landmark_mds_with_duplicated_points():
+    points = np.repeat(np.random.RandomState(2).rand(20, 2), 3, axis=0)
+    lmds = mp.LandmarkMDS()
+    proj = lmds(euclidean(points), n_landmarks=40, random_state=3)
+    assert len(np.unique(lmds.landmarks)) == 40
+    # Planar points are recovered up to a rigid motion.
+    np.testing.assert_allclose(euclidean(proj), euclidean(points), atol=1e-8)
+
+
+def exact_classical_mds(diss, n_components):
+    n = len(diss)
+    center = np.eye(n) - 1.0 / n
+    eigvals, eigvecs = np.linalg.eigh(-0.5 * center @ np.square(diss) @ center)
+    top = np.argsort(eigvals)[::-1][:n_components]
+    return eigvecs[:, top] * np.sqrt(np.maximum(eigvals[top], 0))
+
+
+@pytest.mark.parametrize('as_input', [
+    lambda diss: diss,
+    lambda diss: squareform(diss, checks=False),
+    lambda diss: (len(diss), lambda idx: diss[:, idx]),
+])
+@pytest.mark.parametrize('block_elements', [mp.BLOCK_ELEMENTS, 150])
+def test_classical_mds_matches_eigendecomposition(as_input, block_elements):
+    diss = euclidean(np.random.RandomState(4).rand(60, 5) * [4, 2, 1, 0.5, 0.2])
+    cmds = mp.ClassicalMDS()
+    proj = cmds(as_input(diss), block_elements=block_elements, random_state=5)
+    exact = exact_classical_mds(diss, 2)
+    # Columns are defined up to their signs.
+    signs = np.sign(np.sum(proj * exact, axis=0))
+    np.testing.assert_allclose(proj * signs, exact, atol=1e-4)
+    # The projected objects are placed at their own positions.
+    np.testing.assert_allclose(cmds.transform(diss), proj, atol=1e-4)
+
+
+def test_landmark_mds_transform_places_new_points():
+    points = np.random.RandomState(6).rand(70, 2)
+    diss = euclidean(points)
+    lmds = mp.LandmarkMDS()
+    proj = lmds(diss[:60, :60], n_landmarks=10, random_state=7)
+    np.testing.assert_allclose(lmds.transform(diss[:60, :60]), proj, atol=1e-8)
+    # New points keep their distances to the projected ones.
+    placed = lmds.transform(diss[60:, :60])
+    np.testing.assert_allclose(squareform(pdist(np.vstack([proj, placed])))[60:, :60], diss[60:, :60], atol=1e-8)
+
+
+def test_mds_transform_lowers_the_stress_of_interpolation():
+    diss = euclidean(np.random.RandomState(8).rand(40, 2))
+    mds = mp.MDS()
+    proj = mds(diss[:35, :35], random_state=9).copy()
+
+    def stress(pos):
+        return np.sum(np.square(cdist(pos, proj) - diss[35:, :35]))
+
+    placed = mds.transform(diss[35:, :35])
+    assert stress(placed) <= stress(mp.BaseProjection.transform(mds, diss[35:, :35]))
+    # The projected objects stay fixed.
+    np.testing.assert_array_equal(mds.projected_data, proj)
+
+
+def test_neighborhood_measures_match_sklearn():
+    from sklearn.manifold import trustworthiness
+    rng = np.random.RandomState(10)
+    points = rng.rand(300, 6)
+    embedding = points[:, :2] + rng.normal(0, 0.05, (300, 2))
+    diss = euclidean(points)
+    for as_input in (diss, squareform(diss, checks=False)):
+        trust, cont, kept = mp.neighborhood_measures(as_input, embedding, n_neighbors=7, sample_size=None,
+                                                     block_elements=1000)
+        np.testing.assert_allclose(trust, trustworthiness(points, embedding, n_neighbors=7))
+        # The continuity is the trustworthiness with the roles swapped.
+        np.testing.assert_allclose(cont, trustworthiness(embedding, points, n_neighbors=7))
+        assert 0 < kept < 1
+
+
+def test_projection_quality_accepts_numpy_seeds():
+    diss = euclidean(np.random.RandomState(11).rand(120, 3))
+    embedding = np.random.RandomState(12).rand(120, 2)
+    first = mp.projection_quality(diss, embedding, sample_size=50, random_state=np.int64(13))
+    assert mp.projection_quality(diss, embedding, sample_size=50, random_state=np.int64(13)) == first
+    assert mp.projection_quality(diss, embedding, sample_size=50, random_state=13) == first
+
+
+def test_string_initializations_go_to_sklearn():
+    diss = euclidean(np.random.RandomState(14).rand(40, 3))
+    proj = mp.TSNE()(diss, init='random', perplexity=10, random_state=15)
+    assert proj.shape == (40, 2)
+    mds = mp.MDS(warm_start=True)
+    proj = mds(diss, init='random', n_init=1, random_state=16).copy()
+    assert proj.shape == (40, 2)
+    # A named initialization is used instead of the previous result.
+    np.testing.assert_array_equal(mds(diss, init='random', n_init=1, random_state=16), proj)
+
+
+@pytest.mark.parametrize('projection, kwargs', [
+    (mp.MDS, {'n_init': 1, 'random_state': 17}),
+    (mp.TSNE, {'init': 'random', 'perplexity': 10, 'random_state': 17}),
+    (mp.SpectralEmbedding, {'random_state': 17}),
+    (mp.ClassicalMDS, {'random_state': 17}),
+    (mp.LandmarkMDS, {'n_landmarks': 10, 'random_state': 17}),
+])
+def test_every_projection_transforms_alike(projection, kwargs):
+    diss = euclidean(np.random.RandomState(18).rand(50, 3))
+    proj = projection()
+    proj(diss[:45, :45], **kwargs)
+    for args in ({}, {'n_neighbors': 3}):
+        placed = proj.transform(diss[45:, :45], **args)
+        assert placed.shape == (5, 2)
+        assert np.all(np.isfinite(placed))
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+
+from scatterchart import PolygonSelection, ScatterChart
+
+
+HULLS = [
+    [[0.1, 0.1], [0.6, 0.15], [0.55, 0.7], [0.2, 0.5]],
+    [[0.4, 0.3], [0.9, 0.35], [0.8, 0.9], [0.35, 0.8]],
+    # Concave, overlapping both others.
+    [[0.0, 0.6], [0.5, 0.2], [1.0, 0.6], [0.5, 0.4]],
+]
+
+
+def BruteForce(data, coords):
+    path = Path(np.vstack([coords, coords[:1]]), closed=True)
+    return np.array([path.contains_point(p) for p in data])
+
+
+class Chart(object):
+    # The state ScatterChart's middle-click handler uses, without a canvas.
+    MOUSE_BUTTONS = ScatterChart.MOUSE_BUTTONS
+    _hulls_mask = ScatterChart._hulls_mask
+    cb_mouse_press_event = ScatterChart.cb_mouse_press_event
+
+    def __init__(self, data, chulls):
+        self.data = data
+        self._chulls = chulls
+        self.region_selection_enabled = True
+        self.erased = []
+
+    def highlight_data(self, idx, erase, update_chart):
+        assert erase
+        self.erased.append(np.asarray(idx))
+
+    def notify_parent(self):
+        pass
+
+
+def MakeHulls(data):
+    axes = Figure().add_subplot(111)
+    hulls = []
+    for coords in HULLS:
+        hull = PolygonSelection(axes, data)
+        for point in coords:
+            hull.add_hull_point(point)
+        hull.finish_hull()
+        hulls.append(hull)
+    return hulls
+
+
+def test_hull_mask_matches_contains_point():
+    data = np.random.RandomState(0).rand(2000, 2) * 1.2 - 0.1
+    for hull, coords in zip(MakeHulls(data), HULLS):
+        np.testing.assert_array_equal(hull.mask, BruteForce(data, np.array(coords)))
+        assert hull.highlighted_data == np.flatnonzero(hull.mask).tolist()
+
+
+def test_deleted_hull_erases_only_uncovered_points():
+    data = np.random.RandomState(1).rand(2000, 2) * 1.2 - 0.1
+    inside = [BruteForce(data, np.array(coords)) for coords in HULLS]
+    for deleted in range(len(HULLS)):
+        chart = Chart(data, MakeHulls(data))
+        # A click inside the hull only, so no other hull is hit first.
+        others = [c for i, c in enumerate(HULLS) if i != deleted]
+        click = next(p for p in data[inside[deleted]]
+                     if not any(BruteForce([p], np.array(c))[0] for c in HULLS[:deleted]))
+        chart.cb_mouse_press_event(SimpleNamespace(button=2, xdata=click[0], ydata=click[1]))
+
+        covered = np.zeros(len(data), dtype=bool)
+        for coords in others:
+            covered |= BruteForce(data, np.array(coords))
+        assert len(chart._chulls) == len(HULLS) - 1
+        np.testing.assert_array_equal(chart.erased[0], np.flatnonzero(inside[deleted] & ~covered))
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+
+import serialization
+
+
+def test_loaded_entries_are_copy_on_write(tmp_path):
+    cache = serialization.DistanceCache(str(tmp_path))
+    key = cache.make_key(name='diss')
+    assert cache.store(key, np.arange(6.0))
+    arr = cache.load(key)
+    # Modified in place like a computed array, the entry stays as it was.
+    arr[0] = -1
+    np.testing.assert_array_equal(cache.load(key), np.arange(6.0))
+
+
+def test_entries_larger_than_the_limit_are_not_stored(tmp_path):
+    cache = serialization.DistanceCache(str(tmp_path), max_bytes=40)
+    key = cache.make_key(name='diss')
+    with pytest.warns(UserWarning):
+        assert not cache.store(key, np.zeros(6))
+    assert cache.load(key) is None
+    assert cache.store(key, np.zeros(5))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = serialization.DistanceCache(str(tmp_path), max_bytes=3 * (128 + 80))
+    keys = [cache.make_key(i=i) for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.store(key, np.zeros(10))
+        # Distinct times of last use, in the order of the keys.
+        os.utime(os.path.join(str(tmp_path), key + '.npy'), (i, i))
+    cache.load(keys[0])
+    cache.store(keys[3], np.zeros(10))
+    assert cache.load(keys[1]) is None
+    for key in (keys[0], keys[2], keys[3]):
+        assert cache.load(key) is not None
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from spatialindex import GridIndex
+
+
+def BruteForce(data, xmin, xmax, ymin, ymax):
+    return np.flatnonzero((data[:, 0] >= xmin) & (data[:, 0] <= xmax) & (data[:, 1] >= ymin) & (data[:, 1] <= ymax))
+
+
+@pytest.mark.parametrize('data', [
+    np.random.RandomState(0).rand(2000, 2),
+    # Clusters, duplicated points and a wide aspect ratio.
+    np.vstack([np.random.RandomState(1).normal(c, 0.01, (300, 2)) for c in (0, 5, 100)]),
+    np.repeat(np.random.RandomState(2).rand(40, 2) * [1000, 1], 10, axis=0),
+    # All points on a vertical line.
+    np.column_stack([np.zeros(500), np.random.RandomState(3).rand(500)]),
+])
+def test_query_box_matches_brute_force(data):
+    index = GridIndex(data)
+    rng = np.random.RandomState(4)
+    lo, hi = data.min(axis=0), data.max(axis=0)
+    span = np.maximum(hi - lo, 1)
+    for _ in range(200):
+        x = lo[0] + span[0] * (rng.rand(2) * 1.4 - 0.2)
+        y = lo[1] + span[1] * (rng.rand(2) * 1.4 - 0.2)
+        np.testing.assert_array_equal(index.query_box(x[0], x[1], y[0], y[1]),
+                                      BruteForce(data, min(x), max(x), min(y), max(y)))
+    # The box of the data itself, boundaries included.
+    np.testing.assert_array_equal(index.query_box(lo[0], hi[0], lo[1], hi[1]), np.arange(len(data)))
+
+
+def test_query_box_without_data():
+    assert len(GridIndex().query_box(0, 1, 0, 1)) == 0
@@ -3,14 +3,32 @@ import sys
 import window
 import dataprovider
 import learn
+from backgroundjob import BackgroundJob
 
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
+
+# Time without weight changes after which the projection is recomputed
+WEIGHT_DEBOUNCE_MS = 300
 
 class VisualProcessFilter(object):
     def __init__(self, s_argv):
         self.app = QtWidgets.QApplication(sys.argv)
         self.mainwindow = window.MainWindow(self)
         self.mainwindow.setupUi()
+        self.data = None
+        # The projection is computed by a background job. While it runs,
+        # only the latest request is kept, it starts when the job ends.
+        self.job = None
+        self.jobRequest = None
+        self.pendingRequest = None
+        self.shownRequest = None
+        self.shownPos = None
+        # Weight slider changes restart the timer, so a drag results in a
+        # single request when it pauses
+        self.weightTimer = QtCore.QTimer()
+        self.weightTimer.setSingleShot(True)
+        self.weightTimer.setInterval(WEIGHT_DEBOUNCE_MS)
+        self.weightTimer.timeout.connect(self.WeightsChanged)
         
     def Init(self):
         self.weights_name = ["Credit Score",
@@ -40,6 +58,12 @@ class VisualProcessFilter(object):
    
         #dots = data.Calculate()
 
+        # The provider and its worker pool are created here, on the main
+        # thread: the pool forks its processes, and forking from the job's
+        # thread while others run can deadlock them.
+        self.data = dataprovider.DataProvider(200, [self.weights[name] for name in self.weights_name])
+        self.data.GetPool()
+
         # Add data  
         self.mainwindow.setMaxNumberOfCases(400)
         self.mainwindow.setCurrentNumberOfCases(200)
@@ -50,24 +74,91 @@ class VisualProcessFilter(object):
         
     def SetFeatureWeightValue(self, obj_name, value):
         self.weights[obj_name] = value
+        self.weightTimer.start()
+
+    def WeightsChanged (self):
+        self.updateNumberOfCases(self.mainwindow.getCurrentNumberOfCases())
     
     def updateNumberOfCases (self, size):
         ax_weights = []
         for i in range(len(self.weights_name)):
             ax_weights.append(self.weights[self.weights_name[i]])
-        
-        data = dataprovider.DataProvider(size, ax_weights)
-        endsit = data.GetEndSituation()
-        dots = data.Calculate()
+        self.RequestProjection(size, ax_weights)
+
+    def RequestProjection (self, size, ax_weights):
+        # A running job is cancelled, the request waits for it to stop.
+        # Requests made meanwhile replace the waiting one, and requests for
+        # the projection being computed or shown are dropped.
+        request = (size, list(ax_weights))
+        if self.job is not None:
+            if not self.job.IsCancelled() and request == self.jobRequest:
+                return
+            self.pendingRequest = request
+            self.job.Cancel()
+            return
+        if request == self.shownRequest:
+            return
+        # The shown projection is the start of the new one
+        init = self.shownPos
+        self.job = BackgroundJob(lambda report: self.ComputeProjection(size, ax_weights, report, init))
+        self.jobRequest = request
+        self.job.progress.connect(self.mainwindow.SetProgress)
+        self.job.resultReady.connect(self.ShowProjection)
+        self.job.failed.connect(self.ProjectionFailed)
+        self.job.finished.connect(self.JobFinished)
+        self.mainwindow.SetProgress(0)
+        self.job.start()
+
+    def ComputeProjection (self, size, ax_weights, report, init=None):
+        # Runs in the job's thread. report(percent) raises when the job is
+        # cancelled, it is called between the steps and while the pool
+        # computes the distances.
+        report(0)
+        # A single provider keeps the loaded data and its worker pool, and
+        # reuses the distance components while the size is unchanged.
+        self.data.SetSize(size)
+        self.data.SetWeights(ax_weights)
+        report(10)
+        endsit = self.data.GetEndSituation()
+        dots = self.data.Calculate(condensed=True, progress=lambda done, total: report(10 + 60 * done / total))
+        report(70)
         mds = learn.mdsClass()
-        pos = mds.mdsGen(dots)
-         
+        pos = mds.mdsGen(dots, init)
+        report(100)
+        return pos, endsit
+
+    def ShowProjection (self, result):
+        pos, endsit = result
+        self.shownRequest = self.jobRequest
+        self.shownPos = pos
         plot = self.mainwindow.GetProjectionChart()
         plot.updateDataPoints(pos, endsit)
+
+    def ProjectionFailed (self, message):
+        print("projection failed:", message)
+
+    def JobFinished (self):
+        self.job.wait()
+        self.job = None
+        # A cancelled job stops the pool, it is created again here rather
+        # than by the next job's thread.
+        self.data.GetPool()
+        if self.pendingRequest is not None:
+            request = self.pendingRequest
+            self.pendingRequest = None
+            self.RequestProjection(*request)
     
     def Start(self):
         self.mainwindow.Show()
-        sys.exit(self.app.exec_())
+        ret = self.app.exec_()
+        self.weightTimer.stop()
+        if self.job is not None:
+            self.pendingRequest = None
+            self.job.Cancel()
+            self.job.wait()
+        if self.data is not None:
+            self.data.Close()
+        sys.exit(ret)
     
 if __name__ == "__main__":
     vpf = VisualProcessFilter(sys.argv)
@@ -208,6 +208,9 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             pass
 
+    def SetProgress (self, value):
+        self.progressBar.setValue(value)
+
     def GetProjectionChart (self):
         assert(self.chart is not None)
         return self.chart
@@ -266,6 +269,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sld_numberofcases.setValue(n_cases)
         #self.controller.updateNumberOfCases(n_cases)
         
+    def getCurrentNumberOfCases (self):
+        assert(self.sld_numberofcases is not None)
+        return self.sld_numberofcases.value()
+        
     ## SIGNAL
     # signal received from the 'sliderReleased' callback
     def setNumberOfCases (self):